@@ -7,12 +7,15 @@ import os
 import sys
 import time
 import click
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional
 
 # Import shared components
 from context import BuildContext
-from utils import load_config, log_info, log_warning, log_error, log_success, IS_MACOS, IS_WINDOWS, IS_LINUX
+from utils import load_config, log_info, log_warning, log_error, log_success, log_stream, join_paths, IS_MACOS, IS_WINDOWS, IS_LINUX
+from pipeline import BuildPipeline, PIPELINE_STEPS, hash_path
 
 # Import modules
 from modules.clean import clean
@@ -100,7 +103,13 @@ def build_main(
     chromium_src_dir: Optional[Path] = None,
     slack_notifications: bool = False,
     patch_interactive: bool = False,
+    patch_batch: bool = False,
+    string_replace_tree: bool = False,
     upload_gcs: bool = True,  # Default to uploading to GCS
+    resume: bool = False,
+    from_step: Optional[str] = None,
+    parallel_architectures: bool = False,
+    jobs: Optional[int] = None,
 ):
     """Main build orchestration"""
     log_info("🚀 Nxtscape Build System")
@@ -127,6 +136,8 @@ def build_main(
     gn_flags_file = None
     architectures = [arch] if arch else []  # Empty list if no arch specified
     universal = False
+    package_compression = "gzip"
+    package_threads = 0
     if config_file:
         config = load_config(config_file)
         log_info(f"📄 Loaded config from: {config_file}")
@@ -139,6 +150,10 @@ def build_main(
             if "architectures" in config["build"]:
                 architectures = config["build"]["architectures"]
             universal = config["build"].get("universal", False)
+            parallel_architectures = config["build"].get(
+                "parallel_architectures", parallel_architectures
+            )
+            jobs = config["build"].get("jobs", jobs)
 
         if "steps" in config:
             clean_flag = config["steps"].get("clean", clean_flag)
@@ -146,6 +161,7 @@ def build_main(
             apply_patches_flag = config["steps"].get(
                 "apply_patches", apply_patches_flag
             )
+            patch_batch = config["steps"].get("patch_batch", patch_batch)
             build_flag = config["steps"].get("build", build_flag)
             sign_flag = config["steps"].get("sign", sign_flag)
             package_flag = config["steps"].get("package", package_flag)
@@ -156,6 +172,15 @@ def build_main(
                 "slack", slack_notifications
             )
 
+        if "string_replaces" in config:
+            string_replace_tree = config["string_replaces"].get(
+                "whole_tree", string_replace_tree
+            )
+
+        if "packaging" in config:
+            package_compression = config["packaging"].get("compression", package_compression)
+            package_threads = config["packaging"].get("threads", package_threads)
+
         if "gn_flags" in config and "file" in config["gn_flags"]:
             gn_flags_file = Path(config["gn_flags"]["file"])
 
@@ -201,6 +226,10 @@ def build_main(
     log_info(f"📍 Architectures: {architectures}")
     log_info(f"📍 Universal build: {universal}")
     log_info(f"📍 Build type: {build_type}")
+    if parallel_architectures and len(architectures) > 1:
+        log_info("📍 Architectures build concurrently")
+    else:
+        parallel_architectures = False
 
     # Start time for overall build
     start_time = time.time()
@@ -209,6 +238,147 @@ def build_main(
     if slack_notifications:
         notify_build_started(build_type, str(architectures))
 
+    # Stage state lives outside out/Default_<arch> so it survives clean
+    pipeline = BuildPipeline(
+        join_paths(chromium_src, "out", "nxtscape_build_state.json"),
+        resume=resume,
+        from_step=from_step,
+    )
+    if resume:
+        log_info("♻️  Resume mode: skipping steps whose inputs are unchanged")
+    if from_step:
+        log_info(f"♻️  Starting from step: {from_step}")
+
+    # Fingerprinted inputs of each step
+    config_hash = hash_path(config_file)
+
+    def version_inputs(ctx: BuildContext) -> dict:
+        return {
+            "chromium_version": ctx.chromium_version,
+            "nxtscape_version": ctx.nxtscape_version,
+            "build_type": ctx.build_type,
+        }
+
+    def patch_inputs(ctx: BuildContext) -> dict:
+        return {
+            **version_inputs(ctx),
+            "patches": hash_path(ctx.get_patches_dir()),
+            "resources": hash_path(ctx.get_resources_dir()),
+            "copy_resources": hash_path(ctx.get_copy_resources_config()),
+            "chromium_src": hash_path(ctx.root_dir / "chromium_src"),
+            "string_replace_tree": string_replace_tree,
+        }
+
+    def configure_inputs(ctx: BuildContext) -> dict:
+        return {
+            **version_inputs(ctx),
+            "architecture": ctx.architecture,
+            "gn_flags": hash_path(
+                join_paths(ctx.root_dir, gn_flags_file)
+                if gn_flags_file
+                else ctx.get_gn_flags_file()
+            ),
+        }
+
+    def arch_inputs(ctx: BuildContext) -> dict:
+        return {**version_inputs(ctx), "architecture": ctx.architecture, "config": config_hash}
+
+    def build_architecture(ctx: BuildContext, jobs: Optional[int] = None) -> None:
+        """Configure, compile, sign, package and upload one architecture"""
+        arch_name = ctx.architecture
+
+        # Build for this architecture
+        if build_flag:
+            if slack_notifications:
+                notify_build_step(f"Started building for {arch_name}")
+            pipeline.run(
+                "configure",
+                lambda: configure(ctx, gn_flags_file),
+                lambda: configure_inputs(ctx),
+                arch=arch_name,
+                deps=["clean", "git_setup", "apply_patches"],
+                outputs=[ctx.get_gn_args_file()],
+            )
+            pipeline.run(
+                "compile",
+                lambda: build(ctx, jobs=jobs),
+                lambda: arch_inputs(ctx),
+                arch=arch_name,
+                deps=["apply_patches", f"configure:{arch_name}"],
+                outputs=[ctx.get_app_path() if IS_MACOS else ctx.get_chromium_app_path()],
+            )
+
+            # Run post-build tasks
+            # run_postbuild(ctx)
+
+            if slack_notifications:
+                notify_build_step(f"Completed building for {arch_name}")
+
+        # Sign and package immediately after building each architecture
+        if sign_flag:
+
+            def sign_step():
+                log_info(f"\n🔏 Signing {ctx.architecture} build...")
+                if slack_notifications:
+                    notify_build_step(f"[{ctx.architecture}] Started signing")
+                result = sign(ctx)
+                if slack_notifications:
+                    notify_build_step(f"[{ctx.architecture}] Completed signing")
+                return result
+
+            pipeline.run(
+                "sign",
+                sign_step,
+                lambda: arch_inputs(ctx),
+                arch=arch_name,
+                deps=[f"compile:{arch_name}"],
+                # Signing on macOS also builds the signed DMG
+                outputs=ctx.get_package_artifacts() if IS_MACOS else [],
+            )
+
+        if package_flag:
+
+            def package_step():
+                log_info(f"\n📦 Packaging {ctx.architecture} build...")
+                if slack_notifications:
+                    package_type = "DMG" if IS_MACOS else "package"
+                    notify_build_step(f"[{ctx.architecture}] Started {package_type} creation")
+                result = package(ctx)
+                if slack_notifications:
+                    package_type = "DMG" if IS_MACOS else "package"
+                    notify_build_step(f"[{ctx.architecture}] Completed {package_type} creation")
+                return result
+
+            pipeline.run(
+                "package",
+                package_step,
+                lambda: arch_inputs(ctx),
+                arch=arch_name,
+                deps=[f"compile:{arch_name}", f"sign:{arch_name}"],
+                outputs=ctx.get_package_artifacts(),
+            )
+
+            # Upload to GCS after packaging
+            if upload_gcs:
+
+                def upload_step():
+                    success, gcs_uris = upload_package_artifacts(ctx)
+                    if not success:
+                        log_warning("Failed to upload package artifacts to GCS")
+                    elif gcs_uris and slack_notifications:
+                        notify_gcs_upload(ctx.architecture, gcs_uris)
+                        all_gcs_uris.extend(gcs_uris)
+                    return success
+
+                pipeline.run(
+                    "upload",
+                    upload_step,
+                    lambda: arch_inputs(ctx),
+                    arch=arch_name,
+                    deps=[f"package:{arch_name}"],
+                    outputs=ctx.get_package_artifacts(),
+                )
+
     # Run build steps
     try:
         built_contexts = []
@@ -229,6 +399,8 @@ def build_main(
                 sign_package=sign_flag,
                 package=package_flag,
                 build=build_flag,
+                package_compression=package_compression,
+                package_threads=package_threads,
             )
 
             log_info(f"📍 Chromium: {ctx.chromium_version}")
@@ -237,161 +409,246 @@ def build_main(
 
             # Clean (only for first architecture to avoid conflicts)
             if clean_flag and arch_name == architectures[0]:
-                clean(ctx)
-                if slack_notifications:
-                    notify_build_step("Completed cleaning build artifacts")
+                if pipeline.run("clean", lambda: clean(ctx), always=True):
+                    if slack_notifications:
+                        notify_build_step("Completed cleaning build artifacts")
 
             # Git setup (only once for first architecture)
             if git_setup_flag and arch_name == architectures[0]:
-                setup_git(ctx)
-                if slack_notifications:
-                    notify_build_step("Completed Git setup and Chromium source")
+                if pipeline.run(
+                    "git_setup",
+                    lambda: setup_git(ctx),
+                    lambda: version_inputs(ctx),
+                    deps=["clean"],
+                ):
+                    if slack_notifications:
+                        notify_build_step("Completed Git setup and Chromium source")
 
             # Apply patches (only once for first architecture)
             if apply_patches_flag and arch_name == architectures[0]:
-                # Inject version into manifest files
-                inject_version(ctx)
 
-                # First do chromium file replacements
-                replace_chromium_files(ctx)
+                def patch_step():
+                    # Inject version into manifest files
+                    inject_version(ctx)
 
-                # Then apply string replacements
-                apply_string_replacements(ctx)
+                    # First do chromium file replacements
+                    replace_chromium_files(ctx)
 
-                # Setup sparkle (macOS only)
-                if IS_MACOS:
-                    setup_sparkle(ctx)
-                else:
-                    log_info("Skipping Sparkle setup (macOS only)")
+                    # Then apply string replacements
+                    replaced = apply_string_replacements(ctx, whole_tree=string_replace_tree)
 
-                # Apply patches
-                apply_patches(ctx, interactive=patch_interactive)
+                    # Setup sparkle (macOS only)
+                    if IS_MACOS:
+                        setup_sparkle(ctx)
+                    else:
+                        log_info("Skipping Sparkle setup (macOS only)")
 
+                    # Apply patches
+                    apply_patches(ctx, interactive=patch_interactive, batch=patch_batch)
 
-                # Copy resources
-                copy_resources(ctx)
-                
+                    # Copy resources
+                    copied = copy_resources(ctx)
 
-                if slack_notifications:
-                    notify_build_step(
-                        "Completed applying patches and copying resources"
-                    )
-
-            # Build for this architecture
-            if build_flag:
-                if slack_notifications:
-                    notify_build_step(f"Started building for {arch_name}")
-                configure(ctx, gn_flags_file)
-                build(ctx)
-
-                # Run post-build tasks
-                # run_postbuild(ctx)
+                    # Not recorded as completed, so resume runs it again
+                    return replaced and copied
 
-                if slack_notifications:
-                    notify_build_step(f"Completed building for {arch_name}")
+                if pipeline.run(
+                    "apply_patches",
+                    patch_step,
+                    lambda: patch_inputs(ctx),
+                    deps=["clean", "git_setup"],
+                ):
+                    if slack_notifications:
+                        notify_build_step(
+                            "Completed applying patches and copying resources"
+                        )
 
-            # Sign and package immediately after building each architecture
-            if sign_flag:
-                log_info(f"\n🔏 Signing {ctx.architecture} build...")
-                if slack_notifications:
-                    notify_build_step(f"[{ctx.architecture}] Started signing")
-                sign(ctx)
-                if slack_notifications:
-                    notify_build_step(f"[{ctx.architecture}] Completed signing")
-
-            if package_flag:
-                log_info(f"\n📦 Packaging {ctx.architecture} build...")
-                if slack_notifications:
-                    package_type = "DMG" if IS_MACOS else "package"
-                    notify_build_step(f"[{ctx.architecture}] Started {package_type} creation")
-                package(ctx)
-                if slack_notifications:
-                    package_type = "DMG" if IS_MACOS else "package"
-                    notify_build_step(f"[{ctx.architecture}] Completed {package_type} creation")
-                
-                # Upload to GCS after packaging
-                gcs_uris = []
-                if upload_gcs:
-                    success, gcs_uris = upload_package_artifacts(ctx)
-                    if not success:
-                        log_warning("Failed to upload package artifacts to GCS")
-                    elif gcs_uris and slack_notifications:
-                        notify_gcs_upload(ctx.architecture, gcs_uris)
-                        all_gcs_uris.extend(gcs_uris)
+            if parallel_architectures:
+                # Per-architecture steps run concurrently below
+                built_contexts.append(ctx)
+                continue
 
+            build_architecture(ctx, jobs)
             built_contexts.append(ctx)
 
-        # Handle universal build if requested
-        if len(architectures) > 1 and universal:
-            # Universal build: merge, sign and package
+        # Run per-architecture steps concurrently, one log stream per
+        # architecture. A failing architecture does not stop the others.
+        if parallel_architectures:
+            total_jobs = jobs or multiprocessing.cpu_count()
+            jobs_per_arch = max(1, total_jobs // len(built_contexts))
             log_info(f"\n{'='*60}")
-            log_info("🔄 Creating universal binary...")
+            log_info(
+                f"🔀 Building {len(built_contexts)} architectures concurrently "
+                f"({jobs_per_arch} of {total_jobs} jobs each)"
+            )
             log_info(f"{'='*60}")
 
-            # Import merge function
-            from modules.merge import merge_architectures
+            def build_in_stream(ctx: BuildContext) -> None:
+                with log_stream(ctx.architecture) as log_path:
+                    log_info(f"📝 Logging to {log_path}")
+                    build_architecture(ctx, jobs_per_arch)
+
+            failed_architectures = []
+            with ThreadPoolExecutor(max_workers=len(built_contexts)) as executor:
+                futures = {
+                    executor.submit(build_in_stream, ctx): ctx.architecture
+                    for ctx in built_contexts
+                }
+                for future in as_completed(futures):
+                    arch_name = futures[future]
+                    try:
+                        future.result()
+                        log_success(f"Finished {arch_name}")
+                    except Exception as e:
+                        log_error(f"[{arch_name}] Build failed: {e}")
+                        failed_architectures.append(arch_name)
+
+            if failed_architectures:
+                raise RuntimeError(
+                    f"Build failed for architecture(s): {', '.join(failed_architectures)}"
+                )
+
+        # Handle universal build if requested
+        if len(architectures) > 1 and universal:
+            universal_deps = [
+                f"{step}:{arch_name}"
+                for arch_name in architectures
+                for step in ("compile", "sign")
+            ]
+            universal_inputs = lambda: {
+                **version_inputs(built_contexts[0]),
+                "architectures": architectures,
+                "config": config_hash,
+            }
 
             # Get paths for the built apps
             arch1_app = built_contexts[0].get_app_path()
             arch2_app = built_contexts[1].get_app_path()
-
-            # Clean up old universal output directory if it exists
             universal_dir = built_contexts[0].chromium_src / "out/Default_universal"
-            if universal_dir.exists():
-                log_info("🧹 Cleaning up old universal output directory...")
-                from utils import safe_rmtree
-                safe_rmtree(universal_dir)
-
-            # Create fresh universal output path
-            universal_dir.mkdir(parents=True, exist_ok=True)
             universal_app_path = universal_dir / built_contexts[0].NXTSCAPE_APP_NAME
+            # Universal DMG built by package_universal (always the unsigned name)
+            universal_naming_ctx = BuildContext(
+                root_dir=root_dir,
+                chromium_src=built_contexts[0].chromium_src,
+                architecture="universal",
+                build_type=build_type,
+            )
+            universal_dmg = join_paths(root_dir, "dmg", universal_naming_ctx.get_dmg_name())
+            # Elsewhere package_universal packages each architecture separately
+            universal_packages = (
+                [universal_dmg]
+                if IS_MACOS
+                else [path for ctx in built_contexts for path in ctx.get_package_artifacts()]
+            )
 
-            # Find universalizer script
-            universalizer_script = root_dir / "build" / "universalizer_patched.py"
+            def merge_step():
+                # Universal build: merge, sign and package
+                log_info(f"\n{'='*60}")
+                log_info("🔄 Creating universal binary...")
+                log_info(f"{'='*60}")
+
+                # Import merge function
+                from modules.merge import merge_architectures
+
+                # Clean up old universal output directory if it exists
+                if universal_dir.exists():
+                    log_info("🧹 Cleaning up old universal output directory...")
+                    from utils import safe_rmtree
+                    safe_rmtree(universal_dir)
+
+                # Create fresh universal output path
+                universal_dir.mkdir(parents=True, exist_ok=True)
+
+                # Find universalizer script
+                universalizer_script = root_dir / "build" / "universalizer_patched.py"
+
+                # Merge the architectures
+                if not merge_architectures(
+                    arch1_app, arch2_app, universal_app_path, universalizer_script
+                ):
+                    raise RuntimeError(
+                        "Failed to merge architectures into universal binary"
+                    )
 
-            # Merge the architectures
-            if not merge_architectures(
-                arch1_app, arch2_app, universal_app_path, universalizer_script
-            ):
-                raise RuntimeError(
-                    "Failed to merge architectures into universal binary"
-                )
+                if slack_notifications:
+                    notify_build_step(
+                        "Completed merging architectures into universal binary"
+                    )
 
-            if slack_notifications:
-                notify_build_step(
-                    "Completed merging architectures into universal binary"
-                )
+            pipeline.run(
+                "merge",
+                merge_step,
+                universal_inputs,
+                deps=universal_deps,
+                outputs=[universal_app_path],
+            )
 
             if sign_flag:
-                if slack_notifications:
-                    notify_build_step("[Universal] Started signing and notarization")
-                sign_universal(built_contexts)
-                if slack_notifications:
-                    notify_build_step("[Universal] Completed signing and notarization")
+
+                def sign_universal_step():
+                    if slack_notifications:
+                        notify_build_step("[Universal] Started signing and notarization")
+                    result = sign_universal(built_contexts)
+                    if slack_notifications:
+                        notify_build_step("[Universal] Completed signing and notarization")
+                    return result
+
+                pipeline.run(
+                    "sign_universal",
+                    sign_universal_step,
+                    universal_inputs,
+                    deps=["merge"],
+                    outputs=[universal_app_path],
+                )
 
             if package_flag:
-                if slack_notifications:
-                    package_type = "DMG" if IS_MACOS else "package"
-                    notify_build_step(f"[Universal] Started {package_type} creation")
-                package_universal(built_contexts)
-                if slack_notifications:
-                    package_type = "DMG" if IS_MACOS else "package"
-                    notify_build_step(f"[Universal] Completed {package_type} creation")
-                
+
+                def package_universal_step():
+                    if slack_notifications:
+                        package_type = "DMG" if IS_MACOS else "package"
+                        notify_build_step(f"[Universal] Started {package_type} creation")
+                    result = package_universal(built_contexts)
+                    if slack_notifications:
+                        package_type = "DMG" if IS_MACOS else "package"
+                        notify_build_step(f"[Universal] Completed {package_type} creation")
+                    return result
+
+                pipeline.run(
+                    "package_universal",
+                    package_universal_step,
+                    universal_inputs,
+                    deps=["merge", "sign_universal"],
+                    outputs=universal_packages,
+                )
+
                 # Upload universal package to GCS
-                universal_gcs_uris = []
                 if upload_gcs:
-                    # Use the first context with universal architecture override
-                    universal_ctx = built_contexts[0]
-                    original_arch = universal_ctx.architecture
-                    universal_ctx.architecture = "universal"
-                    success, universal_gcs_uris = upload_package_artifacts(universal_ctx)
-                    if not success:
-                        log_warning("Failed to upload universal package artifacts to GCS")
-                    elif universal_gcs_uris and slack_notifications:
-                        notify_gcs_upload("universal", universal_gcs_uris)
-                        all_gcs_uris.extend(universal_gcs_uris)
-                    universal_ctx.architecture = original_arch
+
+                    def upload_universal_step():
+                        # Use the first context with universal architecture override
+                        universal_ctx = built_contexts[0]
+                        original_arch = universal_ctx.architecture
+                        universal_ctx.architecture = "universal"
+                        try:
+                            success, universal_gcs_uris = upload_package_artifacts(
+                                universal_ctx, universal_packages
+                            )
+                        finally:
+                            universal_ctx.architecture = original_arch
+                        if not success:
+                            log_warning("Failed to upload universal package artifacts to GCS")
+                        elif universal_gcs_uris and slack_notifications:
+                            notify_gcs_upload("universal", universal_gcs_uris)
+                            all_gcs_uris.extend(universal_gcs_uris)
+                        return success
+
+                    pipeline.run(
+                        "upload_universal",
+                        upload_universal_step,
+                        universal_inputs,
+                        deps=["package_universal"],
+                        outputs=universal_packages,
+                    )
 
         # Summary
         elapsed = time.time() - start_time
@@ -484,6 +741,12 @@ def build_main(
     default=False,
     help="Apply string replacements to chromium files",
 )
+@click.option(
+    "--string-replace-tree",
+    is_flag=True,
+    default=False,
+    help="Apply string replacements to every *.grd, *.grdp and *.xtb file instead of the default list",
+)
 @click.option(
     "--patch-interactive",
     "-i",
@@ -491,6 +754,38 @@ def build_main(
     default=False,
     help="Ask for confirmation before applying each patch",
 )
+@click.option(
+    "--patch-batch",
+    is_flag=True,
+    default=False,
+    help="Dry-run all patches, report every conflict, then apply them in one pass (never prompts)",
+)
+@click.option(
+    "--resume",
+    "-r",
+    is_flag=True,
+    default=False,
+    help="Skip steps that completed in a previous run with unchanged inputs",
+)
+@click.option(
+    "--from-step",
+    type=click.Choice(PIPELINE_STEPS),
+    default=None,
+    help="Skip all steps before this one",
+)
+@click.option(
+    "--parallel-arches",
+    is_flag=True,
+    default=False,
+    help="Build, sign and package multiple architectures concurrently",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=int,
+    default=None,
+    help="Total parallel compile jobs, split across concurrently built architectures",
+)
 @click.option(
     "--no-gcs-upload",
     is_flag=True,
@@ -512,7 +807,13 @@ def main(
     merge,
     add_replace,
     string_replace,
+    string_replace_tree,
     patch_interactive,
+    patch_batch,
+    resume,
+    from_step,
+    parallel_arches,
+    jobs,
     no_gcs_upload,
 ):
     """Simple build system for Nxtscape Browser"""
@@ -563,7 +864,7 @@ def main(
         )
 
         # Apply string replacements
-        if apply_string_replacements(ctx):
+        if apply_string_replacements(ctx, whole_tree=string_replace_tree):
             sys.exit(0)
         else:
             sys.exit(1)
@@ -604,7 +905,13 @@ def main(
         chromium_src_dir=chromium_src,
         slack_notifications=slack_notifications,
         patch_interactive=patch_interactive,
+        patch_batch=patch_batch,
+        string_replace_tree=string_replace_tree,
         upload_gcs=not no_gcs_upload,  # Invert the flag
+        resume=resume,
+        from_step=from_step,
+        parallel_architectures=parallel_arches,
+        jobs=jobs,
     )
 
 
@@ -7,6 +7,7 @@ import time
 import sys
 from pathlib import Path
 from dataclasses import dataclass
+from typing import List
 from utils import (
     log_info,
     log_error,
@@ -40,6 +41,8 @@ class BuildContext:
     nxtscape_version: str = ""
     nxtscape_chromium_version: str = ""
     start_time: float = 0.0
+    package_compression: str = "gzip"  # gzip, xz or zstd (Linux packages)
+    package_threads: int = 0  # Compression threads, 0 = all cores
 
     # App names - will be set based on platform
     CHROMIUM_APP_NAME: str = ""
@@ -146,6 +149,18 @@ class BuildContext:
         """Get Nxtscape specific patches directory"""
         return join_paths(self.get_patches_dir(), "nxtscape")
 
+    def get_patch_state_dir(self) -> Path:
+        """Get applied-patch ledger directory (one tree, shared by all architectures)"""
+        return join_paths(self.chromium_src, "out", "nxtscape_patches")
+
+    def get_string_replace_manifest(self) -> Path:
+        """Get string replacement manifest path (per-file hashes and counts)"""
+        return join_paths(self.chromium_src, self.out_dir, "nxtscape_string_replaces.json")
+
+    def get_sync_manifest(self, name: str) -> Path:
+        """Get file sync manifest path for a copy step (e.g. chromium_replace)"""
+        return join_paths(self.chromium_src, self.out_dir, f"nxtscape_sync_{name}.json")
+
     def get_sparkle_dir(self) -> Path:
         """Get Sparkle directory"""
         return join_paths(self.chromium_src, "third_party", "sparkle")
@@ -217,6 +232,33 @@ class BuildContext:
                 return f"{self.NXTSCAPE_APP_BASE_NAME}_{self.nxtscape_chromium_version}_{self.architecture}_signed.dmg"
             return f"{self.NXTSCAPE_APP_BASE_NAME}_{self.nxtscape_chromium_version}_{self.architecture}.dmg"
 
+    def get_tarball_name(self) -> str:
+        """Get Linux tarball filename (extension from package_compression)"""
+        from modules.archive_stream import COMPRESSION_EXTENSIONS
+
+        extension = COMPRESSION_EXTENSIONS.get(self.package_compression, self.package_compression)
+        return f"{self.NXTSCAPE_APP_BASE_NAME}_{self.nxtscape_chromium_version}_{self.architecture}_linux.tar.{extension}"
+
+    def get_deb_name(self) -> str:
+        """Get .deb filename (Debian architecture naming)"""
+        package_name = self.NXTSCAPE_APP_BASE_NAME.lower().replace(" ", "-")
+        deb_arch = "amd64" if self.architecture == "x64" else "arm64"
+        return f"{package_name}_{self.nxtscape_chromium_version}_{deb_arch}.deb"
+
+    def get_package_artifacts(self) -> List[Path]:
+        """Get the package files built for this architecture"""
+        if IS_MACOS:
+            # The signing step builds the signed DMG, packaging the plain one
+            return [join_paths(self.root_dir, "dmg", self.get_dmg_name(self.sign_package))]
+        dist_dir = join_paths(self.root_dir, "dist")
+        if IS_WINDOWS:
+            base_name = f"{self.NXTSCAPE_APP_BASE_NAME}_{self.nxtscape_chromium_version}_{self.architecture}"
+            return [
+                dist_dir / f"{base_name}_installer.exe",
+                dist_dir / f"{base_name}_installer.zip",
+            ]
+        return [dist_dir / self.get_tarball_name(), dist_dir / self.get_deb_name()]
+
     def get_nxtscape_version(self) -> str:
         """Get Nxtscape version string"""
         return self.nxtscape_chromium_version
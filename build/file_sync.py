@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Incremental file sync shared by chromium file replacement and resource copying
+"""
+
+import os
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from utils import log_warning, get_file_hash
+
+
+BUILD_VARIANT_SUFFIXES = (".debug", ".release")
+
+
+class FileSync:
+    """Copy files only when their content differs from the destination.
+
+    A manifest remembers, per destination, the source and destination
+    size/mtime and the content hash of the last sync. Files whose stats
+    still match are skipped without being read; otherwise sizes and then
+    hashes are compared. Changed files are written atomically so ninja
+    never sees a half-written input.
+    """
+
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = manifest_path
+        self.records = self._load()
+        self.copied = 0
+        self.unchanged = 0
+        self.skipped = 0
+
+    def _load(self) -> Dict:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log_warning(f"Ignoring unreadable sync manifest {self.manifest_path}: {e}")
+            return {}
+
+    def save(self) -> None:
+        """Persist the manifest"""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, indent=2)
+        tmp_path.replace(self.manifest_path)
+
+    def sync_file(self, src: Path, dst: Path) -> bool:
+        """Copy src to dst (preserving metadata) if the content differs; True if copied"""
+        key = str(dst)
+        record = self.records.get(key)
+        src_stat = _stat_key(src)
+        dst_stat = _stat_key(dst)
+
+        if record and dst_stat and record["src"] == list(src_stat) and record["dst"] == list(dst_stat):
+            self.unchanged += 1
+            return False
+
+        if dst_stat and dst_stat[0] == src_stat[0]:
+            src_hash = get_file_hash(src)
+            if record and record["dst"] == list(dst_stat):
+                dst_hash = record["sha256"]
+            else:
+                dst_hash = get_file_hash(dst)
+            if src_hash == dst_hash:
+                self._record(key, src_stat, dst_stat, src_hash)
+                self.unchanged += 1
+                return False
+        else:
+            src_hash = None
+
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dst.with_name(f".{dst.name}.nxtscape-sync")
+        shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dst)
+
+        self._record(key, src_stat, _stat_key(dst), src_hash or get_file_hash(dst))
+        self.copied += 1
+        return True
+
+    def sync_tree(self, src_dir: Path, dst_dir: Path) -> None:
+        """Sync every file under src_dir into dst_dir (like copytree with dirs_exist_ok)"""
+        for dirpath, _, filenames in os.walk(src_dir, followlinks=True):
+            rel_dir = Path(dirpath).relative_to(src_dir)
+            for filename in filenames:
+                self.sync_file(Path(dirpath, filename), dst_dir / rel_dir / filename)
+
+    def summary(self) -> str:
+        """One-line copied/skipped/unchanged report"""
+        return f"{self.copied} copied, {self.skipped} skipped, {self.unchanged} unchanged"
+
+    def _record(self, key: str, src_stat: Tuple[int, int], dst_stat: Tuple[int, int], sha256: str) -> None:
+        self.records[key] = {"src": list(src_stat), "dst": list(dst_stat), "sha256": sha256}
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int]]:
+    """(size, mtime_ns) of a file, None if missing"""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+def build_variant_map(src_dir: Path, build_type: str) -> Tuple[Dict[Path, Path], Dict[Path, Path]]:
+    """Pick the file to use for each destination in a single directory pass.
+
+    Files named <name>.debug / <name>.release replace <name> for the
+    matching build type. Returns ({dest_relative: source}, {relative: source})
+    where the second map holds files skipped for this build type.
+    """
+    generic: Dict[Path, Path] = {}
+    variants: Dict[Path, Path] = {}
+    skipped: Dict[Path, Path] = {}
+    wanted_suffix = f".{build_type}"
+
+    for dirpath, _, filenames in os.walk(src_dir):
+        rel_dir = Path(dirpath).relative_to(src_dir)
+        for filename in filenames:
+            src_file = Path(dirpath, filename)
+            stem, suffix = os.path.splitext(filename)
+            if suffix in BUILD_VARIANT_SUFFIXES:
+                if suffix == wanted_suffix:
+                    variants[rel_dir / stem] = src_file
+                else:
+                    skipped[rel_dir / filename] = src_file
+            else:
+                generic[rel_dir / filename] = src_file
+
+    selected = dict(generic)
+    for dest_relative, src_file in variants.items():
+        if dest_relative in selected:
+            skipped[dest_relative] = selected[dest_relative]
+        selected[dest_relative] = src_file
+
+    return dict(sorted(selected.items())), skipped
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Streaming archive writers for packaging
+
+Tar members are written straight from the source files (no staging copy),
+several archives can be fed from one read of each file, compression can use
+several threads, and .deb (ar) containers are assembled in place.
+"""
+
+import os
+import gzip
+import lzma
+import shutil
+import tarfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Sequence, Tuple
+
+
+# Supported compressions and the file extension they use
+COMPRESSION_EXTENSIONS = {
+    "gzip": "gz",
+    "xz": "xz",
+    "zstd": "zst",
+}
+
+READ_CHUNK_SIZE = 1024 * 1024
+GZIP_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+@dataclass
+class PackageFile:
+    """One regular file in a package: read from source, or given as data"""
+
+    path: str  # Path inside the package, "/" separated
+    source: Optional[Path] = None
+    data: Optional[bytes] = None
+    mode: Optional[int] = None  # Source permissions when not set
+
+    @property
+    def size(self) -> int:
+        if self.data is not None:
+            return len(self.data)
+        return self.source.stat().st_size
+
+
+class ParallelGzipWriter:
+    """gzip compression of independent blocks on a thread pool.
+
+    The output is a multi-member gzip stream, which gzip, tar and dpkg read
+    like a single stream. zlib releases the GIL, so blocks compress in
+    parallel.
+    """
+
+    def __init__(self, fileobj: BinaryIO, threads: int = 0, level: int = 6):
+        self.fileobj = fileobj
+        self.level = level
+        self.threads = threads or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        self.pending = []
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self.buffer += data
+        while len(self.buffer) >= GZIP_BLOCK_SIZE:
+            block = bytes(self.buffer[:GZIP_BLOCK_SIZE])
+            del self.buffer[:GZIP_BLOCK_SIZE]
+            self._submit(block)
+
+    def _submit(self, block: bytes) -> None:
+        self.pending.append(self.executor.submit(gzip.compress, block, self.level, mtime=0))
+        # Bound memory: keep at most two blocks per thread in flight
+        while len(self.pending) > self.threads * 2:
+            self.fileobj.write(self.pending.pop(0).result())
+
+    def close(self) -> None:
+        if self.buffer or not self.pending:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        for future in self.pending:
+            self.fileobj.write(future.result())
+        self.pending = []
+        self.executor.shutdown()
+
+
+class ExternalCompressorWriter:
+    """Pipe data through an external multi-threaded compressor (xz -T, zstd -T)"""
+
+    def __init__(self, fileobj: BinaryIO, cmd: List[str]):
+        self.fileobj = fileobj
+        self.cmd = cmd
+        # The compressor writes to the same open file, after what we wrote so far
+        fileobj.flush()
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=fileobj.fileno())
+
+    def write(self, data: bytes) -> None:
+        self.process.stdin.write(data)
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"{self.cmd[0]} failed with exit code {self.process.returncode}")
+        self.fileobj.seek(0, os.SEEK_END)
+
+
+class LzmaWriter:
+    """Single-threaded xz fallback when the xz tool is not installed"""
+
+    def __init__(self, fileobj: BinaryIO):
+        self.fileobj = fileobj
+        self.compressor = lzma.LZMACompressor(format=lzma.FORMAT_XZ)
+
+    def write(self, data: bytes) -> None:
+        self.fileobj.write(self.compressor.compress(data))
+
+    def close(self) -> None:
+        self.fileobj.write(self.compressor.flush())
+
+
+def open_compressor(fileobj: BinaryIO, compression: str, threads: int = 0):
+    """Get a writer compressing into fileobj (threads=0 uses all cores)"""
+    if compression == "gzip":
+        return ParallelGzipWriter(fileobj, threads)
+    if compression == "xz":
+        if shutil.which("xz"):
+            return ExternalCompressorWriter(fileobj, ["xz", f"-T{threads}", "-c", "-6"])
+        return LzmaWriter(fileobj)
+    if compression == "zstd":
+        if not shutil.which("zstd"):
+            raise RuntimeError("zstd compression requested but the zstd tool is not installed")
+        return ExternalCompressorWriter(fileobj, ["zstd", f"-T{threads}", "-q", "-c"])
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+class TarStreamWriter:
+    """Writes a tar stream member by member into any writable sink.
+
+    Members are owned by root, parent directories are added automatically
+    and file data is passed in chunks, so files never need to be staged.
+    """
+
+    def __init__(self, sink, prefix: str = "", mtime: Optional[int] = None):
+        self.sink = sink
+        self.prefix = prefix.rstrip("/")
+        self.mtime = mtime
+        self.directories = set()
+        self.offset = 0
+        self.remaining = 0
+
+    def _write(self, data: bytes) -> None:
+        self.sink.write(data)
+        self.offset += len(data)
+
+    def _name(self, path: str) -> str:
+        return f"{self.prefix}/{path}" if self.prefix else path
+
+    def _header(self, name: str, type: bytes, mode: int, size: int = 0, mtime: Optional[int] = None) -> None:
+        info = tarfile.TarInfo(name)
+        info.type = type
+        info.mode = mode
+        info.size = size
+        info.mtime = int(mtime if mtime is not None else (self.mtime or 0))
+        info.uid = info.gid = 0
+        info.uname = info.gname = "root"
+        self._write(info.tobuf(tarfile.GNU_FORMAT, "utf-8", "surrogateescape"))
+
+    def add_directory(self, path: str, mode: int = 0o755) -> None:
+        name = self._name(path).rstrip("/")
+        if not name or name in self.directories:
+            return
+        self._add_parents(name)
+        self.directories.add(name)
+        self._header(name, tarfile.DIRTYPE, mode)
+
+    def _add_parents(self, name: str) -> None:
+        parent = name.rsplit("/", 1)[0] if "/" in name else ""
+        if parent and parent not in self.directories and parent != ".":
+            self._add_parents(parent)
+            self.directories.add(parent)
+            self._header(parent, tarfile.DIRTYPE, 0o755)
+
+    def begin_file(self, path: str, size: int, mode: int, mtime: Optional[int] = None) -> None:
+        name = self._name(path)
+        self._add_parents(name)
+        self._header(name, tarfile.REGTYPE, mode, size, mtime)
+        self.remaining = size
+
+    def write(self, data: bytes) -> None:
+        self.remaining -= len(data)
+        if self.remaining < 0:
+            raise RuntimeError("Tar member grew while it was being archived")
+        self._write(data)
+
+    def end_file(self) -> None:
+        if self.remaining:
+            raise RuntimeError("Tar member shrank while it was being archived")
+        padding = -self.offset % tarfile.BLOCKSIZE
+        if padding:
+            self._write(tarfile.NUL * padding)
+
+    def add_bytes(self, path: str, data: bytes, mode: int = 0o644) -> None:
+        self.begin_file(path, len(data), mode)
+        self.write(data)
+        self.end_file()
+
+    def close(self) -> None:
+        self._write(tarfile.NUL * (tarfile.BLOCKSIZE * 2))
+        padding = -self.offset % tarfile.RECORDSIZE
+        if padding:
+            self._write(tarfile.NUL * padding)
+
+
+def write_package_files(files: Sequence[PackageFile], targets: Sequence[Tuple[TarStreamWriter, str]]) -> int:
+    """Add files to several tar streams, reading each source file only once.
+
+    targets pairs each writer with the directory the files go under in
+    that archive. Returns the number of bytes read.
+    """
+    total = 0
+    for entry in files:
+        paths = [f"{base}/{entry.path}" if base else entry.path for _, base in targets]
+
+        if entry.data is not None:
+            mode = entry.mode if entry.mode is not None else 0o644
+            for (writer, _), path in zip(targets, paths):
+                writer.add_bytes(path, entry.data, mode)
+            total += len(entry.data)
+            continue
+
+        with open(entry.source, "rb") as f:
+            st = os.fstat(f.fileno())
+            mode = entry.mode if entry.mode is not None else st.st_mode & 0o7777
+            for (writer, _), path in zip(targets, paths):
+                writer.begin_file(path, st.st_size, mode, st.st_mtime)
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+                for writer, _ in targets:
+                    writer.write(chunk)
+            for writer, _ in targets:
+                writer.end_file()
+            total += st.st_size
+    return total
+
+
+class ArWriter:
+    """Minimal ar archive writer for .deb files.
+
+    Members of unknown size (streamed, compressed data) get a placeholder
+    header that is patched once the member is complete.
+    """
+
+    def __init__(self, fileobj: BinaryIO, mtime: int = 0):
+        self.fileobj = fileobj
+        self.mtime = mtime
+        self.member_start = None
+        self.member_name = None
+        fileobj.write(b"!<arch>\n")
+
+    def _header(self, name: str, size: int) -> bytes:
+        header = (
+            f"{name:<16}{self.mtime:<12}{0:<6}{0:<6}{'100644':<8}{size:<10}`\n"
+        ).encode("ascii")
+        if len(header) != 60:
+            raise ValueError(f"Invalid ar member: {name}")
+        return header
+
+    def add_bytes(self, name: str, data: bytes) -> None:
+        self.fileobj.write(self._header(name, len(data)))
+        self.fileobj.write(data)
+        if len(data) % 2:
+            self.fileobj.write(b"\n")
+
+    def begin_member(self, name: str) -> None:
+        self.member_name = name
+        self.member_start = self.fileobj.tell()
+        self.fileobj.write(self._header(name, 0))
+
+    def end_member(self) -> None:
+        end = self.fileobj.tell()
+        size = end - self.member_start - 60
+        self.fileobj.seek(self.member_start)
+        self.fileobj.write(self._header(self.member_name, size))
+        self.fileobj.seek(end)
+        if size % 2:
+            self.fileobj.write(b"\n")
+        self.member_start = None
@@ -7,6 +7,7 @@ import sys
 import shutil
 from pathlib import Path
 from context import BuildContext
+from file_sync import FileSync, build_variant_map
 from utils import log_info, log_success, log_error, log_warning
 
 
@@ -22,40 +23,18 @@ def replace_chromium_files(ctx: BuildContext, replacements=None) -> bool:
         log_info(f"⚠️  No chromium_src directory found at: {replacement_dir}")
         return True
 
-    replaced_count = 0
-    skipped_count = 0
-
-    # Find all files recursively in the replacement directory
-    for src_file in replacement_dir.rglob("*"):
-        if src_file.is_file():
-            # Skip build-type specific files that don't match current build type
-            if src_file.suffix in ['.debug', '.release']:
-                # Check if this file matches the current build type
-                if (ctx.build_type == 'debug' and src_file.suffix != '.debug') or \
-                   (ctx.build_type == 'release' and src_file.suffix != '.release'):
-                    skipped_count += 1
-                    continue
-                
-                # For matching build type files, determine the actual destination
-                # Remove the .debug/.release suffix for the destination path
-                relative_path = src_file.relative_to(replacement_dir)
-                # Convert path to string, remove suffix, then back to Path
-                dest_relative = Path(str(relative_path).rsplit('.', 1)[0])
-            else:
-                # Regular file without build type suffix
-                relative_path = src_file.relative_to(replacement_dir)
-                dest_relative = relative_path
-                
-                # Check if build-type specific version exists
-                debug_variant = src_file.with_suffix(src_file.suffix + '.debug')
-                release_variant = src_file.with_suffix(src_file.suffix + '.release')
-                
-                # If a build-type specific variant exists for current build type, skip the generic file
-                if (ctx.build_type == 'debug' and debug_variant.exists()) or \
-                   (ctx.build_type == 'release' and release_variant.exists()):
-                    log_info(f"    ⏭️  Skipping {relative_path} (using {ctx.build_type} variant instead)")
-                    skipped_count += 1
-                    continue
+    # Pick the generic or build-type specific file for each destination
+    selected, skipped = build_variant_map(replacement_dir, ctx.build_type)
+    for relative_path in skipped:
+        if relative_path in selected:
+            log_info(f"    ⏭️  Skipping {relative_path} (using {ctx.build_type} variant instead)")
+
+    sync = FileSync(ctx.get_sync_manifest("chromium_replace"))
+    sync.skipped = len(skipped)
+
+    try:
+        for dest_relative, src_file in selected.items():
+            relative_path = src_file.relative_to(replacement_dir)
 
             # Destination path in actual chromium source
             dst_file = ctx.chromium_src / dest_relative
@@ -70,16 +49,17 @@ def replace_chromium_files(ctx: BuildContext, replacements=None) -> bool:
                 )
 
             try:
-                # Replace the file
-                shutil.copy2(src_file, dst_file)
-                log_info(f"    ✓ Replaced: {relative_path} → {dest_relative}")
-                replaced_count += 1
+                # Replace the file only if its content changed
+                if sync.sync_file(src_file, dst_file):
+                    log_info(f"    ✓ Replaced: {relative_path} → {dest_relative}")
 
             except Exception as e:
                 log_error(f"    Error replacing file {relative_path}: {e}")
                 raise
+    finally:
+        sync.save()
 
-    log_success(f"Replaced {replaced_count} files (skipped {skipped_count} non-matching files)")
+    log_success(f"Replaced files: {sync.summary()}")
     return True
 
 
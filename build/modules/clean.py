@@ -19,6 +19,11 @@ def clean(ctx: BuildContext) -> bool:
         safe_rmtree(out_path)
         log_success("Cleaned build directory")
     
+    # The tree is reset below, so the applied-patch ledger goes too
+    patch_state_dir = ctx.get_patch_state_dir()
+    if patch_state_dir.exists():
+        safe_rmtree(patch_state_dir)
+    
     log_info("\n🔀 Resetting git branch and removing all tracked files...")
     git_reset(ctx)
     
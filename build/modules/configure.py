@@ -37,9 +37,8 @@ def configure(ctx: BuildContext, gn_flags_file: Optional[Path] = None) -> bool:
     args_file.write_text(args_content)
     
     # Run gn gen
-    os.chdir(ctx.chromium_src)
     gn_cmd = "gn.bat" if IS_WINDOWS else "gn"
-    run_command([gn_cmd, "gen", ctx.out_dir, "--fail-on-unused-args"])
+    run_command([gn_cmd, "gen", ctx.out_dir, "--fail-on-unused-args"], cwd=ctx.chromium_src)
     
     log_success("Build configured")
     return True
\ No newline at end of file
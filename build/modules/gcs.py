@@ -4,10 +4,15 @@ Google Cloud Storage upload module for Nxtscape build artifacts
 """
 
 import os
+import time
+import base64
+import hashlib
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 from context import BuildContext
-from utils import log_info, log_error, log_success, log_warning, IS_WINDOWS, IS_MACOS, IS_LINUX, join_paths
+from utils import log_info, log_error, log_success, log_warning, ContextThreadPoolExecutor, IS_WINDOWS, IS_MACOS, IS_LINUX, join_paths
 
 # Try to import google-cloud-storage
 try:
@@ -20,11 +25,195 @@ except ImportError:
 # Service account file name
 SERVICE_ACCOUNT_FILE = "gclient.json"
 
+# Concurrent uploads (also the size of the client's connection pool)
+UPLOAD_WORKERS = 4
+
+# Files above this size are uploaded as resumable uploads in chunks
+RESUMABLE_THRESHOLD = 8 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 32 * 1024 * 1024  # Must be a multiple of 256 KiB
+
+# Retries per file, with exponential backoff
+UPLOAD_RETRIES = 4
+RETRY_BASE_DELAY = 2.0
+
+# Storage module replacing google.cloud.storage (e.g. a local fake for tests)
+_storage_backend = None
+_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+
+@dataclass
+class UploadResult:
+    """Outcome of uploading one file"""
+
+    path: Path
+    blob_name: str
+    size: int = 0
+    seconds: float = 0.0
+    attempts: int = 0
+    skipped: bool = False  # Remote object already had the same content
+    error: Optional[str] = None
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.seconds if self.seconds > 0 else 0.0
+
+
+def set_storage_backend(backend) -> None:
+    """Use a module with the google.cloud.storage Client API instead of GCS.
+
+    An injected backend is created with Client() and needs no credentials.
+    Pass None to go back to google.cloud.storage.
+    """
+    global _storage_backend
+    _storage_backend = backend
+    with _clients_lock:
+        _clients.clear()
+
+
+def get_storage_client(service_account_path: Optional[Path] = None):
+    """Shared storage client, created once per credentials file.
+
+    The client's HTTP connection pool is sized for UPLOAD_WORKERS threads.
+    """
+    key = str(service_account_path or "")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+
+        if _storage_backend is not None:
+            client = _storage_backend.Client()
+        elif service_account_path:
+            credentials = service_account.Credentials.from_service_account_file(
+                str(service_account_path)
+            )
+            client = storage.Client(credentials=credentials)
+            _resize_connection_pool(client, UPLOAD_WORKERS)
+        else:
+            client = storage.Client.create_anonymous_client()
+
+        _clients[key] = client
+        return client
+
+
+def _resize_connection_pool(client, size: int) -> None:
+    """Let `size` threads share the client's HTTP session without blocking"""
+    http = getattr(client, "_http", None)
+    if http is None or not hasattr(http, "mount"):
+        return
+    try:
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        return
+    adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+    http.mount("https://", adapter)
+    http.mount("http://", adapter)
+
+
+def get_local_md5(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Base64 MD5 of a file, in the format GCS reports md5_hash"""
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode("ascii")
+
+
+def get_local_crc32c(file_path: Path, chunk_size: int = 1024 * 1024) -> Optional[str]:
+    """Base64 CRC32C of a file (None if google-crc32c is not installed)"""
+    try:
+        import google_crc32c
+    except ImportError:
+        return None
+    checksum = google_crc32c.Checksum()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            checksum.update(chunk)
+    return base64.b64encode(checksum.digest()).decode("ascii")
+
+
+def remote_matches(bucket, blob_name: str, file_path: Path, size: int, local_md5: str) -> bool:
+    """Whether the remote object already has this file's content.
+
+    A failed lookup (e.g. no read permission on the bucket) counts as no
+    match, so the file is uploaded.
+    """
+    try:
+        remote = bucket.get_blob(blob_name)
+    except Exception as e:
+        log_warning(f"Could not look up {blob_name}, uploading it: {e}")
+        return False
+    if remote is None or remote.size != size:
+        return False
+    if remote.md5_hash:
+        return remote.md5_hash == local_md5
+    # Composite objects only carry a CRC32C
+    if getattr(remote, "crc32c", None):
+        return remote.crc32c == get_local_crc32c(file_path)
+    return False
+
+
+def upload_file(bucket, file_path: Path, blob_name: str) -> UploadResult:
+    """Upload one file unless the remote copy matches, retrying with backoff"""
+    result = UploadResult(path=file_path, blob_name=blob_name)
+    try:
+        result.size = file_path.stat().st_size
+        local_md5 = get_local_md5(file_path)
+    except OSError as e:
+        result.error = str(e)
+        return result
+
+    if remote_matches(bucket, blob_name, file_path, result.size, local_md5):
+        result.skipped = True
+        return result
+
+    # Only the upload itself is retried
+    for attempt in range(1, UPLOAD_RETRIES + 1):
+        result.attempts = attempt
+        try:
+            if result.size > RESUMABLE_THRESHOLD:
+                blob = bucket.blob(blob_name, chunk_size=UPLOAD_CHUNK_SIZE)
+            else:
+                blob = bucket.blob(blob_name)
+            # GCS verifies the upload against this hash
+            blob.md5_hash = local_md5
+
+            start = time.monotonic()
+            blob.upload_from_filename(str(file_path))
+            result.seconds = time.monotonic() - start
+            result.error = None
+            return result
+        except Exception as e:
+            result.error = str(e)
+            if attempt < UPLOAD_RETRIES:
+                delay = RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                log_warning(
+                    f"Upload of {file_path.name} failed (attempt {attempt}/{UPLOAD_RETRIES}): {e}, "
+                    f"retrying in {delay:.0f}s"
+                )
+                time.sleep(delay)
+
+    return result
+
+
+def upload_files(
+    bucket, files: Sequence[Tuple[Path, str]], max_workers: int = UPLOAD_WORKERS
+) -> List[UploadResult]:
+    """Upload (file, blob name) pairs concurrently; results keep input order.
+
+    A failed file does not stop the others.
+    """
+    if not files:
+        return []
+    with ContextThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files)))) as executor:
+        return list(executor.map(lambda item: upload_file(bucket, *item), files))
+
 
 def upload_to_gcs(ctx: BuildContext, file_paths: List[Path]) -> tuple[bool, List[str]]:
     """Upload build artifacts to Google Cloud Storage
     Returns: (success, list of GCS URIs)"""
-    if not GCS_AVAILABLE:
+    if not GCS_AVAILABLE and _storage_backend is None:
         log_warning("google-cloud-storage not installed. Skipping GCS upload.")
         log_info("Install with: pip install google-cloud-storage")
         return True, []  # Not a fatal error
@@ -47,91 +236,78 @@ def upload_to_gcs(ctx: BuildContext, file_paths: List[Path]) -> tuple[bool, List
     
     log_info(f"\n☁️  Uploading artifacts to gs://{bucket_name}/{gcs_prefix}/")
     
-    # Check for service account file
+    # Check for service account file (not needed by an injected backend)
     service_account_path = join_paths(ctx.root_dir, SERVICE_ACCOUNT_FILE)
-    if not service_account_path.exists():
+    if _storage_backend is None and not service_account_path.exists():
         log_error(f"Service account file not found: {SERVICE_ACCOUNT_FILE}")
         log_info(f"Please place the service account JSON file at: {service_account_path}")
         return False, []
     
     try:
-        # Initialize GCS client with service account
-        credentials = service_account.Credentials.from_service_account_file(
-            str(service_account_path)
-        )
-        client = storage.Client(credentials=credentials)
-        bucket = client.bucket(bucket_name)
-        
-        uploaded_files = []
-        gcs_uris = []
-        
-        for file_path in file_paths:
-            if not file_path.exists():
-                log_warning(f"File not found, skipping: {file_path}")
-                continue
-            
-            # Determine blob name (file name in GCS)
-            blob_name = f"{gcs_prefix}/{file_path.name}"
-            
-            try:
-                blob = bucket.blob(blob_name)
-                
-                log_info(f"📤 Uploading {file_path.name}...")
-                blob.upload_from_filename(str(file_path))
-                
-                # Note: With uniform bucket-level access, objects inherit bucket's IAM policies
-                # No need to set individual object ACLs
-                
-                public_url = f"https://storage.googleapis.com/{bucket_name}/{blob_name}"
-                gcs_uri = f"gs://{bucket_name}/{blob_name}"
-                uploaded_files.append(public_url)
-                gcs_uris.append(gcs_uri)
-                log_success(f"✓ Uploaded: {public_url}")
-                    
-            except Exception as e:
-                log_error(f"Failed to upload {file_path.name}: {e}")
-                return False, []
-        
-        if uploaded_files:
-            log_success(f"\n☁️  Successfully uploaded {len(uploaded_files)} file(s) to GCS")
-            log_info("\nPublic URLs:")
-            for url in uploaded_files:
-                log_info(f"  {url}")
-        
-        return True, gcs_uris
-        
+        bucket = get_storage_client(service_account_path).bucket(bucket_name)
     except Exception as e:
         log_error(f"GCS upload failed: {e}")
         return False, []
 
+    files = []
+    for file_path in file_paths:
+        if not file_path.exists():
+            log_warning(f"File not found, skipping: {file_path}")
+            continue
+        # Blob name is the file name under the version/platform prefix
+        files.append((file_path, f"{gcs_prefix}/{file_path.name}"))
+
+    log_info(f"📤 Uploading {len(files)} file(s)...")
+    results = upload_files(bucket, files)
+
+    # Note: With uniform bucket-level access, objects inherit bucket's IAM policies
+    # No need to set individual object ACLs
+    uploaded_files = []
+    gcs_uris = []
+    failed = []
+    for result in results:
+        public_url = f"https://storage.googleapis.com/{bucket_name}/{result.blob_name}"
+        if result.error:
+            log_error(f"Failed to upload {result.path.name}: {result.error}")
+            failed.append(result)
+            continue
+        if result.skipped:
+            log_info(f"✓ Unchanged, not re-uploaded: {public_url}")
+        else:
+            rate = result.bytes_per_second / (1024 * 1024)
+            log_success(f"✓ Uploaded: {public_url} ({result.size // (1024*1024)} MB, {rate:.1f} MB/s)")
+        uploaded_files.append(public_url)
+        gcs_uris.append(f"gs://{bucket_name}/{result.blob_name}")
+
+    if uploaded_files:
+        unchanged = sum(1 for result in results if result.skipped)
+        log_success(
+            f"\n☁️  Successfully uploaded {len(uploaded_files) - unchanged} file(s) to GCS"
+            + (f" ({unchanged} already up to date)" if unchanged else "")
+        )
+        log_info("\nPublic URLs:")
+        for url in uploaded_files:
+            log_info(f"  {url}")
+
+    if failed:
+        log_error(f"{len(failed)} file(s) failed to upload to GCS")
+        return False, gcs_uris
+
+    return True, gcs_uris
+
 
-def upload_package_artifacts(ctx: BuildContext) -> tuple[bool, List[str]]:
+def upload_package_artifacts(ctx: BuildContext, artifacts: Optional[List[Path]] = None) -> tuple[bool, List[str]]:
     """Upload package artifacts (DMG, ZIP, EXE, tar.gz, DEB) to GCS
+
+    Only the packages of ctx.architecture are uploaded (or the given
+    artifacts), so concurrently built architectures don't upload each
+    other's files.
     Returns: (success, list of GCS URIs)"""
     log_info("\n☁️  Preparing to upload package artifacts to GCS...")
     
-    artifacts = []
-    
-    if IS_MACOS:
-        # Look for DMG files
-        dmg_dir = ctx.root_dir / "dmg"
-        if dmg_dir.exists():
-            artifacts.extend(dmg_dir.glob("*.dmg"))
-    
-    elif IS_WINDOWS:
-        # Look for installer and ZIP files
-        dist_dir = ctx.root_dir / "dist"
-        if dist_dir.exists():
-            artifacts.extend(dist_dir.glob("*.exe"))
-            artifacts.extend(dist_dir.glob("*.zip"))
-    
-    else:
-        # Linux: Look for tar.gz, deb, and AppImage files
-        dist_dir = ctx.root_dir / "dist"
-        if dist_dir.exists():
-            artifacts.extend(dist_dir.glob("*.tar.gz"))
-            artifacts.extend(dist_dir.glob("*.deb"))
-            artifacts.extend(dist_dir.glob("*.AppImage"))
+    if artifacts is None:
+        artifacts = ctx.get_package_artifacts()
+    artifacts = [Path(artifact) for artifact in artifacts if Path(artifact).exists()]
     
     if not artifacts:
         log_info("No package artifacts found to upload")
@@ -153,24 +329,18 @@ def upload_signed_artifacts(ctx: BuildContext) -> bool:
 
 def download_from_gcs(bucket_name: str, source_path: str, dest_path: Path, ctx: Optional[BuildContext] = None) -> bool:
     """Download a file from GCS (utility function)"""
-    if not GCS_AVAILABLE:
+    if not GCS_AVAILABLE and _storage_backend is None:
         log_error("google-cloud-storage not installed")
         return False
     
     try:
-        # Try to use service account if available
-        client = None
+        # Use service account if available, else an anonymous client for public buckets
+        service_account_path = None
         if ctx:
             service_account_path = join_paths(ctx.root_dir, SERVICE_ACCOUNT_FILE)
-            if service_account_path.exists():
-                credentials = service_account.Credentials.from_service_account_file(
-                    str(service_account_path)
-                )
-                client = storage.Client(credentials=credentials)
-        
-        # Fall back to anonymous client for public buckets
-        if not client:
-            client = storage.Client.create_anonymous_client()
+            if not service_account_path.exists():
+                service_account_path = None
+        client = get_storage_client(service_account_path)
         
         bucket = client.bucket(bucket_name)
         blob = bucket.blob(source_path)
@@ -1,17 +1,27 @@
 #!/usr/bin/env python3
 """
 Linux packaging module for Nxtscape Browser
-Supports .tar.gz, .AppImage, and .deb package formats
+Supports .tar.gz/.tar.xz/.tar.zst, .AppImage, and .deb package formats
 """
 
+import io
 import os
 import sys
+import gzip
+import time
 import shutil
-import tarfile
 import subprocess
 from pathlib import Path
 from typing import Optional, List, Dict
 from context import BuildContext
+from modules.archive_stream import (
+    COMPRESSION_EXTENSIONS,
+    ArWriter,
+    PackageFile,
+    TarStreamWriter,
+    open_compressor,
+    write_package_files,
+)
 from utils import (
     run_command,
     log_info,
@@ -23,8 +33,41 @@ from utils import (
 )
 
 
+
+# Files copied from the build output next to the chrome binary
+ESSENTIAL_FILES = [
+    "chrome_100_percent.pak",
+    "chrome_200_percent.pak",
+    "resources.pak",
+    "icudtl.dat",
+    "chrome_crashpad_handler",
+]
+
+# Directories copied whole from the build output
+ESSENTIAL_DIRS = ["locales", "swiftshader"]
+
+DEB_ICON_SIZES = {
+    "product_logo_48.png": "48x48",
+    "product_logo_64.png": "64x64",
+    "product_logo_128.png": "128x128",
+    "product_logo_256.png": "256x256",
+}
+
+MAINTAINER_SCRIPT = """#!/bin/bash
+# Update desktop database
+if command -v update-desktop-database >/dev/null 2>&1; then
+    update-desktop-database -q /usr/share/applications
+fi
+
+# Update icon cache
+if command -v gtk-update-icon-cache >/dev/null 2>&1; then
+    gtk-update-icon-cache -q /usr/share/icons/hicolor
+fi
+"""
+
+
 def package(ctx: BuildContext) -> bool:
-    """Create Linux packages (.tar.gz, .AppImage, .deb if tools available)"""
+    """Create Linux packages (.tar.gz, .deb, and .AppImage if tools available)"""
     log_info("\n📦 Creating Linux packages...")
 
     if not IS_LINUX:
@@ -32,13 +75,19 @@ def package(ctx: BuildContext) -> bool:
 
     success = True
 
-    # Create tar.gz package (always available)
-    if create_tarball(ctx):
+    # Tarball and .deb are written together from one read of the build output
+    results = create_linux_packages(ctx, tarball=True, deb=True)
+    if results.get("tarball"):
         log_success("Tarball created successfully")
     else:
         log_error("Failed to create tarball")
         success = False
 
+    if results.get("deb"):
+        log_success("DEB package created successfully")
+    else:
+        log_warning("Failed to create DEB package (optional)")
+
     # Try to create AppImage if tools are available
     if check_appimage_tools():
         if create_appimage(ctx):
@@ -48,109 +97,62 @@ def package(ctx: BuildContext) -> bool:
     else:
         log_info("AppImage tools not available, skipping AppImage creation")
 
-    # Try to create .deb if tools are available
-    if check_deb_tools():
-        if create_deb(ctx):
-            log_success("DEB package created successfully")
-        else:
-            log_warning("Failed to create DEB package (optional)")
-    else:
-        log_info("DEB packaging tools not available, skipping DEB creation")
-
     return success
 
 
 def create_tarball(ctx: BuildContext) -> bool:
-    """Create .tar.gz package of the built application"""
-    log_info("\n📦 Creating tarball package...")
+    """Create .tar.<compression> package of the built application"""
+    return create_linux_packages(ctx, tarball=True, deb=False).get("tarball", False)
 
-    # Get paths
-    build_output_dir = join_paths(ctx.chromium_src, ctx.out_dir)
-    chrome_binary = build_output_dir / "chrome"
 
-    if not chrome_binary.exists():
-        log_error(f"Chrome binary not found at: {chrome_binary}")
-        return False
+def create_deb(ctx: BuildContext) -> bool:
+    """Create .deb package"""
+    return create_linux_packages(ctx, tarball=False, deb=True).get("deb", False)
 
-    # Create output directory
-    output_dir = ctx.root_dir / "dist"
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Generate tarball filename with version and architecture
-    tarball_name = f"{ctx.get_app_base_name()}_{ctx.get_nxtscape_version()}_{ctx.architecture}_linux.tar.gz"
-    tarball_path = output_dir / tarball_name
+def collect_app_files(build_output_dir: Path) -> List[PackageFile]:
+    """Manifest of application files to package, relative to the app directory"""
+    files = [PackageFile("chrome", build_output_dir / "chrome")]
 
-    # Create a temporary directory structure for packaging
-    temp_dir = ctx.root_dir / "tmp" / "linux_package"
-    app_dir = temp_dir / ctx.get_app_base_name()
+    for file_name in ESSENTIAL_FILES:
+        src_file = build_output_dir / file_name
+        if src_file.exists():
+            files.append(PackageFile(file_name, src_file))
 
-    try:
-        # Clean and create temp directory
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
-        app_dir.mkdir(parents=True, exist_ok=True)
-
-        # Copy essential files
-        log_info("Copying application files...")
-
-        # Copy the main chrome binary
-        shutil.copy2(chrome_binary, app_dir / "chrome")
-
-        # Copy other essential files commonly needed
-        essential_files = [
-            "chrome_100_percent.pak",
-            "chrome_200_percent.pak",
-            "resources.pak",
-            "icudtl.dat",
-            "chrome_crashpad_handler",
-        ]
-
-        for file_name in essential_files:
-            src_file = build_output_dir / file_name
-            if src_file.exists():
-                shutil.copy2(src_file, app_dir / file_name)
-                log_info(f"  Copied: {file_name}")
-
-        # Copy locales directory if it exists
-        locales_src = build_output_dir / "locales"
-        if locales_src.exists():
-            locales_dst = app_dir / "locales"
-            shutil.copytree(locales_src, locales_dst)
-            log_info("  Copied: locales/")
-
-        # Copy swiftshader directory if it exists (GPU acceleration)
-        swiftshader_src = build_output_dir / "swiftshader"
-        if swiftshader_src.exists():
-            swiftshader_dst = app_dir / "swiftshader"
-            shutil.copytree(swiftshader_src, swiftshader_dst)
-            log_info("  Copied: swiftshader/")
-
-        # Create a simple launch script
-        launch_script = app_dir / f"{ctx.get_app_base_name().lower()}"
-        launch_script.write_text(
-            f"""#!/bin/bash
+    for dir_name in ESSENTIAL_DIRS:
+        src_dir = build_output_dir / dir_name
+        if not src_dir.exists():
+            continue
+        # Follow symlinks like copytree did, so packages contain real files
+        for dirpath, dirnames, filenames in os.walk(src_dir, followlinks=True):
+            dirnames.sort()
+            rel_dir = Path(dirpath).relative_to(build_output_dir).as_posix()
+            for filename in sorted(filenames):
+                files.append(PackageFile(f"{rel_dir}/{filename}", Path(dirpath, filename)))
+
+    return files
+
+
+def get_tarball_extra_files(ctx: BuildContext) -> List[PackageFile]:
+    """Launch script, desktop file and README added to the tarball"""
+    launcher = ctx.get_app_base_name().lower()
+
+    launch_script = f"""#!/bin/bash
 # Nxtscape Browser launch script
 SCRIPT_DIR="$(cd "$(dirname "${{BASH_SOURCE[0]}}")" && pwd)"
 exec "$SCRIPT_DIR/chrome" "$@"
 """
-        )
-        launch_script.chmod(0o755)
-        log_info("  Created: launch script")
 
-        # Create desktop file
-        create_desktop_file(ctx, app_dir)
-
-        # Create README
-        readme_content = f"""Nxtscape Browser {ctx.get_nxtscape_version()}
+    readme_content = f"""Nxtscape Browser {ctx.get_nxtscape_version()}
 ==============================
 
 Installation:
 1. Extract this archive to your preferred location
-2. Run './{ctx.get_app_base_name().lower()}' to start the browser
+2. Run './{launcher}' to start the browser
 3. Optionally, install the desktop file for menu integration
 
 For desktop integration:
-  cp {ctx.get_app_base_name().lower()}.desktop ~/.local/share/applications/
+  cp {launcher}.desktop ~/.local/share/applications/
 
 System Requirements:
 - Linux x86_64 or ARM64
@@ -160,141 +162,22 @@ System Requirements:
 Built on: {ctx.chromium_version}
 Architecture: {ctx.architecture}
 """
-        (app_dir / "README.txt").write_text(readme_content)
-
-        # Create the tarball
-        log_info(f"Creating tarball: {tarball_name}")
-        with tarfile.open(tarball_path, "w:gz") as tar:
-            tar.add(app_dir, arcname=ctx.get_app_base_name())
-
-        # Get file size for logging
-        file_size = tarball_path.stat().st_size
-        log_success(f"Tarball created: {tarball_name} ({file_size // (1024*1024)} MB)")
-
-        return True
-
-    except Exception as e:
-        log_error(f"Failed to create tarball: {e}")
-        return False
-    finally:
-        # Clean up temp directory
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
-
-
-def create_appimage(ctx: BuildContext) -> bool:
-    """Create AppImage package (if tools are available)"""
-    log_info("\n📦 Creating AppImage package...")
-
-    # This is a simplified AppImage creation
-    # In a full implementation, you'd use appimagetool and create proper AppDir structure
-    log_warning("AppImage creation is not yet fully implemented")
-    log_info("Would require appimagetool and proper AppDir structure")
-    return False
-
-
-def create_deb(ctx: BuildContext) -> bool:
-    """Create .deb package (if tools are available)"""
-    log_info("\n📦 Creating DEB package...")
 
-    # Check for dpkg-deb
-    if not shutil.which("dpkg-deb"):
-        log_warning("dpkg-deb not found, cannot create DEB package")
-        return False
+    return [
+        PackageFile(launcher, data=launch_script.encode("utf-8"), mode=0o755),
+        PackageFile(f"{launcher}.desktop", data=get_desktop_file_content(ctx).encode("utf-8")),
+        PackageFile("README.txt", data=readme_content.encode("utf-8")),
+    ]
 
-    # Get paths
-    build_output_dir = join_paths(ctx.chromium_src, ctx.out_dir)
-    chrome_binary = build_output_dir / "chrome"
-
-    if not chrome_binary.exists():
-        log_error(f"Chrome binary not found at: {chrome_binary}")
-        return False
 
-    # Create output directory
-    output_dir = ctx.root_dir / "dist"
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Generate DEB filename with version and architecture
-    # Convert architecture naming for DEB format
-    deb_arch = "amd64" if ctx.architecture == "x64" else "arm64"
-    package_name = ctx.get_app_base_name().lower().replace(" ", "-")
-    deb_name = f"{package_name}_{ctx.get_nxtscape_version()}_{deb_arch}.deb"
-    deb_path = output_dir / deb_name
-
-    # Create a temporary directory structure for DEB packaging
-    temp_dir = ctx.root_dir / "tmp" / "deb_package"
-    package_dir = temp_dir / "package"
-    debian_dir = package_dir / "DEBIAN"
-    usr_dir = package_dir / "usr"
-    bin_dir = usr_dir / "bin"
-    share_dir = usr_dir / "share"
-    app_dir = share_dir / package_name
-    applications_dir = share_dir / "applications"
-    icons_dir = share_dir / "icons" / "hicolor"
-
-    try:
-        # Clean and create temp directory structure
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
-
-        debian_dir.mkdir(parents=True, exist_ok=True)
-        bin_dir.mkdir(parents=True, exist_ok=True)
-        app_dir.mkdir(parents=True, exist_ok=True)
-        applications_dir.mkdir(parents=True, exist_ok=True)
-
-        # Create icon directories
-        for size in ["48x48", "64x64", "128x128", "256x256"]:
-            icon_size_dir = icons_dir / size / "apps"
-            icon_size_dir.mkdir(parents=True, exist_ok=True)
-
-        # Copy application files to /usr/share/package-name/
-        log_info("Copying application files...")
-
-        # Copy the main chrome binary
-        shutil.copy2(chrome_binary, app_dir / "chrome")
-
-        # Copy other essential files
-        essential_files = [
-            "chrome_100_percent.pak",
-            "chrome_200_percent.pak",
-            "resources.pak",
-            "icudtl.dat",
-            "chrome_crashpad_handler",
-        ]
-
-        for file_name in essential_files:
-            src_file = build_output_dir / file_name
-            if src_file.exists():
-                shutil.copy2(src_file, app_dir / file_name)
-                log_info(f"  Copied: {file_name}")
-
-        # Copy locales directory if it exists
-        locales_src = build_output_dir / "locales"
-        if locales_src.exists():
-            locales_dst = app_dir / "locales"
-            shutil.copytree(locales_src, locales_dst)
-            log_info("  Copied: locales/")
-
-        # Copy swiftshader directory if it exists
-        swiftshader_src = build_output_dir / "swiftshader"
-        if swiftshader_src.exists():
-            swiftshader_dst = app_dir / "swiftshader"
-            shutil.copytree(swiftshader_src, swiftshader_dst)
-            log_info("  Copied: swiftshader/")
-
-        # Create wrapper script in /usr/bin/
-        wrapper_script = bin_dir / package_name
-        wrapper_script.write_text(
-            f"""#!/bin/bash
+def get_deb_extra_files(ctx: BuildContext, package_name: str) -> List[PackageFile]:
+    """Wrapper script, desktop file and icons added to the .deb (paths from /)"""
+    wrapper_script = f"""#!/bin/bash
 # {ctx.get_app_base_name()} wrapper script
 exec /usr/share/{package_name}/chrome "$@"
 """
-        )
-        wrapper_script.chmod(0o755)
-        log_info("  Created: wrapper script")
 
-        # Create desktop file
-        desktop_content = f"""[Desktop Entry]
+    desktop_content = f"""[Desktop Entry]
 Version=1.0
 Type=Application
 Name={ctx.get_app_base_name()}
@@ -307,33 +190,29 @@ MimeType=text/html;text/xml;application/xhtml+xml;application/xml;application/vn
 StartupNotify=true
 StartupWMClass={package_name}
 """
-        desktop_file = applications_dir / f"{package_name}.desktop"
-        desktop_file.write_text(desktop_content)
-        log_info("  Created: desktop file")
-
-        # Copy icons if they exist
-        linux_icons_dir = ctx.root_dir / "resources" / "icons" / "linux"
-        if linux_icons_dir.exists():
-            icon_mapping = {
-                "product_logo_48.png": "48x48",
-                "product_logo_64.png": "64x64",
-                "product_logo_128.png": "128x128",
-                "product_logo_256.png": "256x256",
-            }
-
-            for icon_file, size in icon_mapping.items():
-                src_icon = linux_icons_dir / icon_file
-                if src_icon.exists():
-                    dst_icon = icons_dir / size / "apps" / f"{package_name}.png"
-                    shutil.copy2(src_icon, dst_icon)
-                    log_info(f"  Copied icon: {size}")
-
-        # Create DEBIAN control file
-        installed_size = (
-            sum(f.stat().st_size for f in app_dir.rglob("*") if f.is_file()) // 1024
-        )
-
-        control_content = f"""Package: {package_name}
+
+    files = [
+        PackageFile(f"usr/bin/{package_name}", data=wrapper_script.encode("utf-8"), mode=0o755),
+        PackageFile(
+            f"usr/share/applications/{package_name}.desktop",
+            data=desktop_content.encode("utf-8"),
+        ),
+    ]
+
+    linux_icons_dir = ctx.root_dir / "resources" / "icons" / "linux"
+    for icon_file, size in DEB_ICON_SIZES.items():
+        src_icon = linux_icons_dir / icon_file
+        if src_icon.exists():
+            files.append(
+                PackageFile(f"usr/share/icons/hicolor/{size}/apps/{package_name}.png", src_icon)
+            )
+
+    return files
+
+
+def get_deb_control(ctx: BuildContext, package_name: str, deb_arch: str, installed_size: int) -> str:
+    """DEBIAN/control contents"""
+    return f"""Package: {package_name}
 Version: {ctx.get_nxtscape_version()}
 Section: web
 Priority: optional
@@ -353,66 +232,163 @@ Homepage: https://browseros.com
 Installed-Size: {installed_size}
 """
 
-        control_file = debian_dir / "control"
-        control_file.write_text(control_content)
-        log_info("  Created: DEBIAN/control")
-
-        # Create postinst script for desktop file update
-        postinst_content = """#!/bin/bash
-# Update desktop database
-if command -v update-desktop-database >/dev/null 2>&1; then
-    update-desktop-database -q /usr/share/applications
-fi
 
-# Update icon cache
-if command -v gtk-update-icon-cache >/dev/null 2>&1; then
-    gtk-update-icon-cache -q /usr/share/icons/hicolor
-fi
-"""
-        postinst_file = debian_dir / "postinst"
-        postinst_file.write_text(postinst_content)
-        postinst_file.chmod(0o755)
+def build_control_archive(control: str, mtime: int) -> bytes:
+    """control.tar.gz for a .deb, built in memory"""
+    buffer = io.BytesIO()
+    tar = TarStreamWriter(buffer, prefix=".", mtime=mtime)
+    tar.add_directory("")
+    tar.add_bytes("control", control.encode("utf-8"))
+    tar.add_bytes("postinst", MAINTAINER_SCRIPT.encode("utf-8"), 0o755)
+    tar.add_bytes("postrm", MAINTAINER_SCRIPT.encode("utf-8"), 0o755)
+    tar.close()
+    return gzip.compress(buffer.getvalue(), mtime=mtime)
+
+
+def create_linux_packages(ctx: BuildContext, tarball: bool = True, deb: bool = True) -> Dict[str, bool]:
+    """Create the tarball and/or .deb in one streaming pass.
+
+    Files are read once from the build output and written straight into
+    the archive members (no staging copies). Both archives are compressed
+    while they are written, using ctx.package_compression (gzip, xz or
+    zstd) on ctx.package_threads threads. Returns {"tarball": ok, "deb": ok}
+    for the requested formats.
+    """
+    results = {}
+    if tarball:
+        results["tarball"] = False
+    if deb:
+        results["deb"] = False
+    if not results:
+        return results
 
-        # Create postrm script for cleanup
-        postrm_content = """#!/bin/bash
-# Update desktop database
-if command -v update-desktop-database >/dev/null 2>&1; then
-    update-desktop-database -q /usr/share/applications
-fi
+    build_output_dir = join_paths(ctx.chromium_src, ctx.out_dir)
+    chrome_binary = build_output_dir / "chrome"
 
-# Update icon cache
-if command -v gtk-update-icon-cache >/dev/null 2>&1; then
-    gtk-update-icon-cache -q /usr/share/icons/hicolor
-fi
-"""
-        postrm_file = debian_dir / "postrm"
-        postrm_file.write_text(postrm_content)
-        postrm_file.chmod(0o755)
+    if not chrome_binary.exists():
+        log_error(f"Chrome binary not found at: {chrome_binary}")
+        return results
 
-        log_info("  Created: maintainer scripts")
+    compression = ctx.package_compression
+    if compression not in COMPRESSION_EXTENSIONS:
+        log_error(f"Unsupported package compression: {compression}")
+        return results
+    extension = COMPRESSION_EXTENSIONS[compression]
 
-        # Build the DEB package
-        log_info(f"Building DEB package: {deb_name}")
-        run_command(["dpkg-deb", "--build", str(package_dir), str(deb_path)])
+    # Create output directory
+    output_dir = ctx.root_dir / "dist"
+    output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Get file size for logging
-        file_size = deb_path.stat().st_size
-        log_success(f"DEB package created: {deb_name} ({file_size // (1024*1024)} MB)")
+    # Convert architecture naming for DEB format
+    deb_arch = "amd64" if ctx.architecture == "x64" else "arm64"
+    package_name = ctx.get_app_base_name().lower().replace(" ", "-")
 
-        return True
+    tarball_name = ctx.get_tarball_name()
+    deb_name = ctx.get_deb_name()
+    outputs = {}
+    if tarball:
+        outputs["tarball"] = output_dir / tarball_name
+    if deb:
+        outputs["deb"] = output_dir / deb_name
+
+    app_files = collect_app_files(build_output_dir)
+    app_size = sum(entry.size for entry in app_files)
+    log_info(f"Packaging {len(app_files)} files ({app_size // (1024*1024)} MB) with {compression}")
+
+    mtime = int(time.time())
+    open_files = []
+    compressors = []
+    targets = []
+    deb_ar = None
+    try:
+        if tarball:
+            log_info(f"Creating tarball: {tarball_name}")
+            tar_file = open(outputs["tarball"].with_name(outputs["tarball"].name + ".tmp"), "wb")
+            open_files.append(tar_file)
+            compressors.append(open_compressor(tar_file, compression, ctx.package_threads))
+            tar_writer = TarStreamWriter(compressors[-1], prefix=ctx.get_app_base_name(), mtime=mtime)
+            tar_writer.add_directory("")
+            targets.append((tar_writer, ""))
+
+        if deb:
+            log_info(f"Building DEB package: {deb_name}")
+            deb_extra_files = get_deb_extra_files(ctx, package_name)
+            installed_size = (app_size + sum(entry.size for entry in deb_extra_files)) // 1024
+
+            deb_file = open(outputs["deb"].with_name(outputs["deb"].name + ".tmp"), "wb")
+            open_files.append(deb_file)
+            deb_ar = ArWriter(deb_file, mtime=mtime)
+            deb_ar.add_bytes("debian-binary", b"2.0\n")
+            deb_ar.add_bytes(
+                "control.tar.gz",
+                build_control_archive(
+                    get_deb_control(ctx, package_name, deb_arch, installed_size), mtime
+                ),
+            )
+            deb_ar.begin_member(f"data.tar.{extension}")
+            compressors.append(open_compressor(deb_file, compression, ctx.package_threads))
+            deb_writer = TarStreamWriter(compressors[-1], prefix=".", mtime=mtime)
+            deb_writer.add_directory("")
+            targets.append((deb_writer, f"usr/share/{package_name}"))
+
+        # One read of every application file feeds all archives
+        write_package_files(app_files, targets)
+
+        if tarball:
+            write_package_files(get_tarball_extra_files(ctx), [(tar_writer, "")])
+        if deb:
+            write_package_files(deb_extra_files, [(deb_writer, "")])
+
+        for writer, _ in targets:
+            writer.close()
+        for compressor in compressors:
+            compressor.close()
+        compressors = []
+        if deb_ar:
+            deb_ar.end_member()
+        for f in open_files:
+            f.close()
+        open_files = []
+
+        for kind, path in outputs.items():
+            path.with_name(path.name + ".tmp").replace(path)
+            file_size = path.stat().st_size
+            log_success(f"Created: {path.name} ({file_size // (1024*1024)} MB)")
+            results[kind] = True
+
+        return results
 
     except Exception as e:
-        log_error(f"Failed to create DEB package: {e}")
-        return False
+        log_error(f"Failed to create Linux packages: {e}")
+        return results
     finally:
-        # Clean up temp directory
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
+        for compressor in compressors:
+            try:
+                compressor.close()
+            except Exception:
+                pass
+        for f in open_files:
+            f.close()
+        for path in outputs.values():
+            tmp_path = path.with_name(path.name + ".tmp")
+            if tmp_path.exists():
+                tmp_path.unlink()
 
 
-def create_desktop_file(ctx: BuildContext, app_dir: Path) -> bool:
-    """Create .desktop file for Linux desktop integration"""
-    desktop_content = f"""[Desktop Entry]
+def create_appimage(ctx: BuildContext) -> bool:
+    """Create AppImage package (if tools are available)"""
+    log_info("\n📦 Creating AppImage package...")
+
+    # This is a simplified AppImage creation
+    # In a full implementation, you'd use appimagetool and create proper AppDir structure
+    log_warning("AppImage creation is not yet fully implemented")
+    log_info("Would require appimagetool and proper AppDir structure")
+    return False
+
+
+def get_desktop_file_content(ctx: BuildContext) -> str:
+    """Contents of the .desktop file shipped in the tarball"""
+    return f"""[Desktop Entry]
 Version=1.0
 Type=Application
 Name=Nxtscape Browser
@@ -426,6 +402,12 @@ StartupNotify=true
 StartupWMClass=nxtscape-browser
 """
 
+
+
+
+def create_desktop_file(ctx: BuildContext, app_dir: Path) -> bool:
+    """Create .desktop file for Linux desktop integration"""
+    desktop_content = get_desktop_file_content(ctx)
     desktop_file = app_dir / f"{ctx.get_app_base_name().lower()}.desktop"
     desktop_file.write_text(desktop_content)
     log_info("  Created: desktop file")
@@ -437,11 +419,6 @@ def check_appimage_tools() -> bool:
     return shutil.which("appimagetool") is not None
 
 
-def check_deb_tools() -> bool:
-    """Check if DEB package creation tools are available"""
-    return shutil.which("dpkg-deb") is not None
-
-
 def sign_packages(ctx: BuildContext, certificate_path: Optional[str] = None) -> bool:
     """Sign Linux packages (limited support)"""
     log_info("\n🔏 Signing Linux packages...")
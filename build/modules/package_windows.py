@@ -67,15 +67,9 @@ def build_mini_installer(ctx: BuildContext) -> bool:
             "mini_installer"
         ]
         
-        # Change to chromium_src directory before running (like compile.py does)
-        import os
-        old_cwd = os.getcwd()
-        os.chdir(ctx.chromium_src)
-        
-        try:
-            run_command(cmd)
-        finally:
-            os.chdir(old_cwd)
+        # Run from chromium_src (like compile.py does) without changing the
+        # process-wide cwd, other architectures may be building concurrently
+        run_command(cmd, cwd=ctx.chromium_src)
         
         # Verify the file was created
         if mini_installer_path.exists():
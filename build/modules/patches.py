@@ -3,17 +3,35 @@
 Patch management module for Nxtscape build system
 """
 
+import os
+import re
 import sys
+import json
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterator, List
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from context import BuildContext
-from utils import log_info, log_error, log_success, log_warning, IS_WINDOWS
+from utils import log_info, log_error, log_success, log_warning, get_file_hash, IS_WINDOWS
 
 
-def apply_patches(ctx: BuildContext, interactive: bool = False) -> bool:
-    """Apply Nxtscape patches"""
+# Bump when the ledger layout changes; older ledgers are ignored
+LEDGER_VERSION = 1
+
+DIFF_GIT_HEADER = re.compile(r"^diff --git a/(\S+) b/(\S+)$", re.MULTILINE)
+
+# "error: patch failed: <file>:<line>" or "error: <file>: <reason>"
+PATCH_ERROR_LINE = re.compile(r"^error: (?:patch failed: (.+):\d+|(.+?): (?!patch failed).+)$")
+
+
+def apply_patches(ctx: BuildContext, interactive: bool = False, batch: bool = False) -> bool:
+    """Apply Nxtscape patches, re-applying only the part of the series that changed
+
+    With batch=True every pending patch is dry-run first, all conflicts are
+    reported at once and the clean series is applied in one git apply call,
+    without ever prompting.
+    """
     if not ctx.apply_patches:
         log_info("\n⏭️  Skipping patches")
         return True
@@ -43,42 +61,445 @@ def apply_patches(ctx: BuildContext, interactive: bool = False) -> bool:
     
     log_info(f"Found {len(patches)} patches to apply")
     
-    if interactive:
+    if batch and interactive:
+        log_warning("Batch mode never prompts, ignoring interactive mode")
+        interactive = False
+    elif interactive:
         log_info("🔍 Interactive mode enabled - will ask for confirmation before each patch")
     
-    # Apply each patch
-    for i, patch_path in enumerate(patches, 1):
-        if not patch_path.exists():
-            log_info(f"⚠️  Patch file not found: {patch_path}")
-            continue
-        
-        if interactive:
-            # Show patch info and ask for confirmation
-            log_info(f"\n{'='*60}")
-            log_info(f"Patch {i}/{len(patches)}: {patch_path.name}")
-            log_info(f"{'='*60}")
-            
-            while True:
-                choice = input("\nOptions:\n  1) Apply this patch\n  2) Skip this patch\n  3) Stop patching here\nEnter your choice (1-3): ").strip()
+    # Work out which suffix of the series has to be (re-)applied
+    state_dir = ctx.get_patch_state_dir()
+    ledger = load_patch_ledger(state_dir)
+    series = [describe_patch(patch_path, root_patches_dir) for patch_path in patches]
+    start, reset_files = find_first_changed_patch(ledger, series, ctx.chromium_src)
+    kept = ledger["patches"][:start]
+    stale = ledger["patches"][start:]
+    
+    if start == len(series) and not stale:
+        log_success(f"All {len(series)} patches already applied, nothing to do")
+        return True
+    
+    if start:
+        log_info(f"♻️  {start} patches unchanged since last run, re-applying from patch {start + 1}")
+    
+    # Remember content and mtimes of everything the suffix touches so files
+    # that end up byte-identical do not look modified to ninja
+    suffix_files = {path for entry in stale + series[start:] for path in entry["files"]}
+    snapshot = snapshot_tree_files(ctx.chromium_src, suffix_files)
+    
+    revert_patches(stale, state_dir, ctx.chromium_src, reset_files)
+    
+    kept_files = {path for entry in kept for path in entry["files"]}
+    file_states = {
+        path: state for path, state in ledger["files"].items() if path in kept_files
+    }
+    # A file first touched in the suffix is not modified by anything before it
+    for entry in series[start:]:
+        for path in entry["files"]:
+            if path not in file_states:
+                file_states[path] = {"base": get_tree_file_hash(ctx.chromium_src, path)}
+    applied_entries = list(kept)
+    
+    try:
+        if batch:
+            applied_entries += apply_patch_batch(
+                patches[start:], series[start:], ctx.chromium_src, state_dir
+            )
+            for patch_path, entry in zip(patches[start:], series[start:]):
+                if entry["applied"]:
+                    store_patch_blob(state_dir, patch_path, entry["sha256"])
+        else:
+            # Apply each patch
+            for i, patch_path in enumerate(patches[start:], start + 1):
+                entry = series[i - 1]
+                if not patch_path.exists():
+                    log_info(f"⚠️  Patch file not found: {patch_path}")
+                    applied_entries.append(entry)
+                    continue
                 
-                if choice == "1":
-                    apply_single_patch(patch_path, ctx.chromium_src, i, len(patches))
-                    break
-                elif choice == "2":
-                    log_warning(f"⏭️  Skipping patch {patch_path.name}")
-                    break
-                elif choice == "3":
-                    log_info("Stopping patch process as requested")
-                    return True
+                if interactive:
+                    # Show patch info and ask for confirmation
+                    log_info(f"\n{'='*60}")
+                    log_info(f"Patch {i}/{len(patches)}: {patch_path.name}")
+                    log_info(f"{'='*60}")
+                    
+                    stop = False
+                    while True:
+                        choice = input("\nOptions:\n  1) Apply this patch\n  2) Skip this patch\n  3) Stop patching here\nEnter your choice (1-3): ").strip()
+                        
+                        if choice == "1":
+                            entry["applied"] = apply_single_patch(patch_path, ctx.chromium_src, i, len(patches))
+                            break
+                        elif choice == "2":
+                            log_warning(f"⏭️  Skipping patch {patch_path.name}")
+                            entry["applied"] = False
+                            break
+                        elif choice == "3":
+                            log_info("Stopping patch process as requested")
+                            stop = True
+                            break
+                        else:
+                            log_error("Invalid choice. Please enter 1, 2, or 3.")
+                    if stop:
+                        break
                 else:
-                    log_error("Invalid choice. Please enter 1, 2, or 3.")
-        else:
-            apply_single_patch(patch_path, ctx.chromium_src, i, len(patches))
+                    entry["applied"] = apply_single_patch(patch_path, ctx.chromium_src, i, len(patches))
+                
+                applied_entries.append(entry)
+                if entry["applied"]:
+                    store_patch_blob(state_dir, patch_path, entry["sha256"])
+    finally:
+        # Record progress even if patching was aborted part way
+        touched = {path for entry in applied_entries if entry["applied"] for path in entry["files"]}
+        for path in list(file_states):
+            if path in touched:
+                file_states[path]["final"] = get_tree_file_hash(ctx.chromium_src, path)
+            else:
+                del file_states[path]
+        save_patch_ledger(state_dir, {"patches": applied_entries, "files": file_states})
+        restored = restore_unchanged_mtimes(ctx.chromium_src, snapshot)
+        if restored:
+            log_info(f"🕒 Kept original timestamps on {restored} unchanged files")
     
     log_success("Patches applied")
     return True
 
 
+def load_patch_ledger(state_dir: Path) -> Dict:
+    """Load the applied-patch ledger, or an empty one if missing or outdated"""
+    empty = {"patches": [], "files": {}}
+    ledger_file = state_dir / "ledger.json"
+    if not ledger_file.exists():
+        return empty
+    
+    try:
+        with ledger_file.open('r', encoding='utf-8') as f:
+            ledger = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        log_warning(f"Ignoring unreadable patch ledger {ledger_file}: {e}")
+        return empty
+    
+    if ledger.get("version") != LEDGER_VERSION:
+        log_warning(f"Ignoring patch ledger with unknown version: {ledger_file}")
+        return empty
+    
+    return {"patches": ledger.get("patches", []), "files": ledger.get("files", {})}
+
+
+def save_patch_ledger(state_dir: Path, ledger: Dict) -> None:
+    """Write the ledger and drop stored patches it no longer references"""
+    state_dir.mkdir(parents=True, exist_ok=True)
+    
+    ledger_file = state_dir / "ledger.json"
+    tmp_file = ledger_file.with_suffix(".json.tmp")
+    with tmp_file.open('w', encoding='utf-8') as f:
+        json.dump({"version": LEDGER_VERSION, **ledger}, f, indent=2)
+    tmp_file.replace(ledger_file)
+    
+    referenced = {f"{entry['sha256']}.patch" for entry in ledger["patches"] if entry["applied"]}
+    for blob in state_dir.glob("*.patch"):
+        if blob.name not in referenced:
+            blob.unlink()
+
+
+def store_patch_blob(state_dir: Path, patch_path: Path, sha256: str) -> None:
+    """Keep a content-addressed copy of an applied patch so it can be reverted later"""
+    blob = state_dir / f"{sha256}.patch"
+    if not blob.exists():
+        state_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(patch_path, blob)
+
+
+def describe_patch(patch_path: Path, patches_dir: Path) -> Dict:
+    """Build a ledger entry for a patch: its series name, content hash and target files"""
+    entry = {
+        "patch": patch_path.relative_to(patches_dir).as_posix(),
+        "sha256": None,
+        "files": [],
+        "applied": False,
+    }
+    if patch_path.exists():
+        entry["sha256"] = get_file_hash(patch_path)
+        entry["files"] = parse_patch_targets(patch_path)
+    return entry
+
+
+def parse_patch_targets(patch_path: Path) -> List[str]:
+    """Get the files a patch touches, relative to the tree root (-p1)"""
+    text = patch_path.read_text(encoding='utf-8', errors='replace')
+    
+    files = []
+    for match in DIFF_GIT_HEADER.finditer(text):
+        for path in match.groups():
+            if path not in files:
+                files.append(path)
+    
+    # Plain unified diffs without git headers
+    if not files:
+        for line in text.splitlines():
+            if not line.startswith(('--- ', '+++ ')):
+                continue
+            path = line[4:].split('\t')[0].strip()
+            if path == '/dev/null':
+                continue
+            path = path.split('/', 1)[-1]
+            if path not in files:
+                files.append(path)
+    
+    return files
+
+
+def get_tree_file_hash(tree_path: Path, relative_path: str) -> Optional[str]:
+    """Hash a file in the tree, None if it does not exist"""
+    file_path = tree_path / relative_path
+    if not file_path.is_file():
+        return None
+    return get_file_hash(file_path)
+
+
+def find_first_changed_patch(ledger: Dict, series: List[Dict], tree_path: Path) -> Tuple[int, Set[str]]:
+    """Find the index of the first patch that has to be (re-)applied.
+    
+    Also returns the files that were reset to their pre-patch content by an
+    earlier build step (e.g. chromium file replacements), which must not be
+    reverted again.
+    """
+    recorded = ledger["patches"]
+    
+    start = 0
+    for entry, recorded_entry in zip(series, recorded):
+        # Skipped or failed patches are retried. A patch missing on disk is
+        # recorded without content and matches as long as it stays missing.
+        if (
+            recorded_entry["patch"] != entry["patch"]
+            or recorded_entry["sha256"] != entry["sha256"]
+            or (not recorded_entry["applied"] and entry["sha256"] is not None)
+        ):
+            break
+        start += 1
+    
+    reset_files = set()
+    drifted = []
+    for path, state in ledger["files"].items():
+        current = get_tree_file_hash(tree_path, path)
+        if current == state["final"]:
+            continue
+        if current == state["base"]:
+            reset_files.add(path)
+            first_touch = next(
+                (i for i, e in enumerate(recorded) if e["applied"] and path in e["files"]),
+                len(recorded),
+            )
+            start = min(start, first_touch)
+        else:
+            drifted.append(path)
+    
+    if drifted:
+        log_error("Patched files were modified outside of the patch series:")
+        for path in drifted:
+            log_error(f"  {path}")
+        log_error("Run with --clean to reset the tree and re-apply all patches")
+        raise RuntimeError(f"{len(drifted)} patched files changed since last patch run")
+    
+    return start, reset_files
+
+
+def revert_patches(entries: List[Dict], state_dir: Path, tree_path: Path, reset_files: Set[str]) -> None:
+    """Revert previously applied patches in reverse order"""
+    for entry in reversed(entries):
+        if not entry["applied"]:
+            continue
+        
+        # Files already back at their pre-patch content are left alone
+        excludes = [f"--exclude={path}" for path in entry["files"] if path in reset_files]
+        if len(excludes) == len(entry["files"]):
+            continue
+        
+        log_info(f"  * Reverting {entry['patch']}")
+        cmd = [
+            'git', 'apply', '-R',
+            '--ignore-whitespace',
+            '--whitespace=nowarn',
+            '-p1',
+            *excludes,
+            str(state_dir / f"{entry['sha256']}.patch"),
+        ]
+        result = subprocess.run(cmd, text=True, capture_output=True, cwd=tree_path)
+        if result.returncode != 0:
+            log_error(f"Failed to revert patch: {entry['patch']}")
+            if result.stderr:
+                log_error(f"Error: {result.stderr}")
+            log_error("Run with --clean to reset the tree and re-apply all patches")
+            raise RuntimeError(f"Failed to revert patch {entry['patch']}")
+
+
+def snapshot_tree_files(tree_path: Path, relative_paths: Set[str]) -> Dict[str, Tuple[str, int, int]]:
+    """Record hash and timestamps of existing files"""
+    snapshot = {}
+    for path in relative_paths:
+        file_path = tree_path / path
+        if file_path.is_file():
+            st = file_path.stat()
+            snapshot[path] = (get_file_hash(file_path), st.st_atime_ns, st.st_mtime_ns)
+    return snapshot
+
+
+def restore_unchanged_mtimes(tree_path: Path, snapshot: Dict[str, Tuple[str, int, int]]) -> int:
+    """Put back timestamps on files whose content did not change"""
+    restored = 0
+    for path, (sha256, atime_ns, mtime_ns) in snapshot.items():
+        file_path = tree_path / path
+        if not file_path.is_file():
+            continue
+        if file_path.stat().st_mtime_ns == mtime_ns:
+            continue
+        if get_file_hash(file_path) == sha256:
+            os.utime(file_path, ns=(atime_ns, mtime_ns))
+            restored += 1
+    return restored
+
+
+def apply_patch_batch(patches: List[Path], entries: List[Dict], tree_path: Path, state_dir: Path) -> List[Dict]:
+    """Dry-run all patches, then apply them in a single git apply call"""
+    present = [(patch_path, entry) for patch_path, entry in zip(patches, entries) if patch_path.exists()]
+    for patch_path in patches:
+        if not patch_path.exists():
+            log_info(f"⚠️  Patch file not found: {patch_path}")
+    
+    log_info(f"🔍 Checking {len(present)} patches...")
+    report = check_patch_series([patch_path for patch_path, _ in present], [entry for _, entry in present], tree_path)
+    
+    report_file = state_dir / "check_report.json"
+    state_dir.mkdir(parents=True, exist_ok=True)
+    with report_file.open('w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    conflicts = [result for result in report if result["status"] != "ok"]
+    if conflicts:
+        log_error(f"{len(conflicts)} of {len(report)} patches do not apply cleanly:")
+        for result in conflicts:
+            log_error(f"  {result['patch']}")
+            for path in result["files"]:
+                log_error(f"      {path}")
+        log_error(f"Full report: {report_file}")
+        log_info("Use --patch-interactive to fix conflicts one patch at a time")
+        raise RuntimeError(f"{len(conflicts)} patches do not apply cleanly")
+    
+    if present:
+        log_info(f"  * Applying {len(present)} patches in one batch")
+        cmd = [
+            'git', 'apply',
+            '--ignore-whitespace',
+            '--whitespace=nowarn',
+            '-p1',
+            *[str(patch_path) for patch_path, _ in present],
+        ]
+        result = subprocess.run(cmd, text=True, capture_output=True, cwd=tree_path)
+        if result.returncode != 0:
+            log_error("Batched patch application failed")
+            if result.stderr:
+                log_error(f"Error: {result.stderr}")
+            raise RuntimeError("Batched patch application failed")
+    
+    for _, entry in present:
+        entry["applied"] = True
+    return entries
+
+
+def check_patch_series(patches: List[Path], entries: List[Dict], tree_path: Path, max_workers: Optional[int] = None) -> List[Dict]:
+    """Run git apply --check for a whole series concurrently.
+    
+    Patches touching a common file are checked together, in series order, so
+    a patch is checked on top of the earlier patches it builds on. Returns
+    one result per patch, in series order.
+    """
+    # Group patches that (transitively) share files
+    groups: List[List[int]] = []
+    group_of_file: Dict[str, int] = {}
+    for i, entry in enumerate(entries):
+        joined = sorted({group_of_file[path] for path in entry["files"] if path in group_of_file})
+        if joined:
+            target = joined[0]
+            for other in joined[1:]:
+                groups[target].extend(groups[other])
+                for path, group in group_of_file.items():
+                    if group == other:
+                        group_of_file[path] = target
+                groups[other] = []
+            groups[target].append(i)
+        else:
+            target = len(groups)
+            groups.append([i])
+        for path in entry["files"]:
+            group_of_file[path] = target
+    
+    results: List[Optional[Dict]] = [None] * len(patches)
+    
+    def check_group(indices: List[int]) -> None:
+        indices = sorted(indices)
+        paths = [patches[i] for i in indices]
+        if run_patch_check(paths, tree_path).returncode == 0:
+            for i in indices:
+                results[i] = patch_check_result(entries[i])
+            return
+        
+        # Something in the group conflicts - find out exactly which patches
+        clean = []
+        for i in indices:
+            result = run_patch_check(clean + [patches[i]], tree_path)
+            if result.returncode == 0:
+                clean.append(patches[i])
+                results[i] = patch_check_result(entries[i])
+            else:
+                results[i] = patch_check_result(entries[i], result.stderr)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(check_group, [group for group in groups if group]))
+    
+    return results
+
+
+def run_patch_check(patches: List[Path], tree_path: Path) -> subprocess.CompletedProcess:
+    """Dry-run one or more patches, applied in order, against the tree.
+    
+    git apply --check tests every patch file given on the command line
+    against the unmodified tree, so a patch could not see lines added by
+    an earlier one. The patches are passed as one stream on stdin instead,
+    which git checks in order.
+    """
+    stream = bytearray()
+    for patch_path in patches:
+        stream += patch_path.read_bytes()
+        if stream and not stream.endswith(b"\n"):
+            stream += b"\n"
+    cmd = [
+        'git', 'apply', '--check',
+        '--ignore-whitespace',
+        '--whitespace=nowarn',
+        '-p1',
+    ]
+    result = subprocess.run(cmd, input=bytes(stream), capture_output=True, cwd=tree_path)
+    return subprocess.CompletedProcess(
+        result.args,
+        result.returncode,
+        result.stdout.decode('utf-8', errors='replace'),
+        result.stderr.decode('utf-8', errors='replace'),
+    )
+
+
+def patch_check_result(entry: Dict, stderr: Optional[str] = None) -> Dict:
+    """Build a dry-run report entry, listing the files git complained about"""
+    if stderr is None:
+        return {"patch": entry["patch"], "status": "ok", "files": [], "error": ""}
+    
+    files = []
+    for line in stderr.splitlines():
+        match = PATCH_ERROR_LINE.match(line)
+        if match:
+            path = match.group(1) or match.group(2)
+            if path not in files:
+                files.append(path)
+    return {"patch": entry["patch"], "status": "conflict", "files": files, "error": stderr.strip()}
 
 
 def parse_series_file(patches_dir: Path) -> Iterator[Path]:
@@ -150,7 +571,7 @@ def apply_single_patch(patch_path: Path, tree_path: Path, current_num: int, tota
         
         if choice == "1":
             log_warning(f"⏭️  Skipping patch {patch_path.name}")
-            return True  # Continue with next patch
+            return False  # Not applied, continue with next patch
         elif choice == "2":
             return apply_single_patch(patch_path, tree_path, current_num, total)
         elif choice == "3":
@@ -9,6 +9,7 @@ import shutil
 import yaml
 from pathlib import Path
 from context import BuildContext
+from file_sync import FileSync
 from utils import log_info, log_success, log_error, log_warning
 
 
@@ -29,6 +30,10 @@ def copy_resources(ctx: BuildContext) -> bool:
         log_info("⚠️  No copy_operations defined in configuration")
         return True
 
+    # Only files whose content changed are written, keeping mtimes stable
+    sync = FileSync(ctx.get_sync_manifest("resources"))
+    success = True
+
     # Process each copy operation
     for operation in config["copy_operations"]:
         name = operation.get("name", "Unnamed operation")
@@ -42,6 +47,7 @@ def copy_resources(ctx: BuildContext) -> bool:
             log_info(
                 f"  ⏭️  Skipping {name} (build_type: {build_type_condition}, current: {ctx.build_type})"
             )
+            sync.skipped += 1
             continue
 
         # Resolve paths
@@ -56,8 +62,9 @@ def copy_resources(ctx: BuildContext) -> bool:
                 if src_path.exists() and src_path.is_dir():
                     dst_path = dst_base
                     dst_path.mkdir(parents=True, exist_ok=True)
-                    shutil.copytree(src_path, dst_path, dirs_exist_ok=True)
-                    log_info(f"    ✓ Copied directory: {source} → {destination}")
+                    copied = sync.copied
+                    sync.sync_tree(src_path, dst_path)
+                    log_info(f"    ✓ Synced directory: {source} → {destination} ({sync.copied - copied} copied)")
                 else:
                     log_warning(f"    Source directory not found: {source}")
 
@@ -66,11 +73,12 @@ def copy_resources(ctx: BuildContext) -> bool:
                 files = glob.glob(str(ctx.root_dir / source))
                 if files:
                     dst_base.mkdir(parents=True, exist_ok=True)
+                    copied = sync.copied
                     for file_path in files:
                         file_path = Path(file_path)
                         if file_path.is_file():
-                            shutil.copy2(file_path, dst_base)
-                    log_info(f"    ✓ Copied {len(files)} files: {source} → {destination}")
+                            sync.sync_file(file_path, dst_base / file_path.name)
+                    log_info(f"    ✓ Synced {len(files)} files: {source} → {destination} ({sync.copied - copied} copied)")
                 else:
                     log_warning(f"    No files found matching: {source}")
 
@@ -78,13 +86,21 @@ def copy_resources(ctx: BuildContext) -> bool:
                 # Copy single file
                 if src_path.exists() and src_path.is_file():
                     dst_base.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(src_path, dst_base)
-                    log_info(f"    ✓ Copied file: {source} → {destination}")
+                    if sync.sync_file(src_path, dst_base):
+                        log_info(f"    ✓ Copied file: {source} → {destination}")
+                    else:
+                        log_info(f"    ✓ Unchanged file: {source} → {destination}")
                 else:
                     log_warning(f"    Source file not found: {source}")
 
         except Exception as e:
             log_error(f"    Error: {e}")
-
-    log_success("Resources copied")
+            success = False
+
+    sync.save()
+    if success:
+        log_success(f"Resources copied: {sync.summary()}")
+    else:
+        log_error(f"Some resources could not be copied: {sync.summary()}")
+    return success
 
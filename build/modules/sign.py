@@ -9,8 +9,9 @@ import sys
 import subprocess
 import glob
 import shutil
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, List, Dict, Tuple
+from typing import Callable, Optional, List, Dict, Tuple
 from context import BuildContext
 from utils import (
     run_command as utils_run_command,
@@ -18,6 +19,7 @@ from utils import (
     log_error,
     log_success,
     log_warning,
+    ContextThreadPoolExecutor,
     IS_MACOS,
 )
 
@@ -102,22 +104,30 @@ def check_environment() -> Tuple[bool, Dict[str, str]]:
     return True, env_vars
 
 
-def find_components_to_sign(
-    app_path: Path, ctx: Optional[BuildContext] = None
-) -> Dict[str, List[Path]]:
-    """Dynamically find all components that need signing"""
-    components = {
-        "helpers": [],
-        "xpc_services": [],
-        "frameworks": [],
-        "dylibs": [],
-        "executables": [],
-        "apps": [],
-    }
+# Concurrent codesign processes (codesign is mostly waiting on the timestamp server)
+SIGN_WORKERS = min(8, os.cpu_count() or 1)
 
-    framework_path = app_path / "Contents" / "Frameworks"
+# Runs a signing command, raising on failure (run_command, or a fake in tests)
+SigningRunner = Callable[[List[str]], object]
+
+# Bundle suffixes that are signed as a whole
+BUNDLE_SUFFIXES = {".xpc": "xpc_services", ".app": "apps", ".framework": "frameworks"}
+
+
+@dataclass
+class SigningComponent:
+    """A signable item and the components nested inside it"""
 
-    # Check both versioned and non-versioned paths for EyeBrowserOS Framework
+    path: Path
+    category: str
+    children: List["SigningComponent"] = field(default_factory=list)
+    level: int = 0  # 0 for innermost; signed after every lower level
+
+
+def get_nxtscape_framework_paths(
+    framework_path: Path, ctx: Optional[BuildContext] = None
+) -> List[Path]:
+    """EyeBrowserOS Framework locations, versioned path first when it exists"""
     nxtscape_framework_paths = [framework_path / "EyeBrowserOS Framework.framework"]
 
     # Add versioned path if context is available
@@ -133,55 +143,143 @@ def find_components_to_sign(
                 0, versioned_path
             )  # Prioritize versioned path
 
-    # Find all helper apps
-    for nxtscape_fw_path in nxtscape_framework_paths:
-        helpers_dir = nxtscape_fw_path / "Helpers"
-        if helpers_dir.exists():
-            # Find all .app helpers
-            components["helpers"].extend(helpers_dir.glob("*.app"))
-            # Find all executable helpers (files without extension)
-            for item in helpers_dir.iterdir():
-                if item.is_file() and not item.suffix and os.access(item, os.X_OK):
-                    components["executables"].append(item)
-            break  # Use the first valid path found
-
-    # Find all XPC services
-    for xpc_path in framework_path.rglob("*.xpc"):
-        components["xpc_services"].append(xpc_path)
-
-    # Find all frameworks (with special handling for Sparkle)
-    for fw_path in framework_path.rglob("*.framework"):
-        components["frameworks"].append(fw_path)
-
-        # Special handling for Sparkle framework versioned structure
-        if "Sparkle.framework" in str(fw_path):
-            # Look for Sparkle's versioned executables at Versions/B/
-            sparkle_version_b = fw_path / "Versions" / "B"
-            if sparkle_version_b.exists():
-                # Add Autoupdate executable if it exists
-                autoupdate = sparkle_version_b / "Autoupdate"
-                if autoupdate.exists() and autoupdate.is_file():
-                    components["executables"].append(autoupdate)
-
-    # Find all dylibs (check versioned path for EyeBrowserOS Framework libraries)
-    for nxtscape_fw_path in nxtscape_framework_paths:
-        libraries_dir = nxtscape_fw_path / "Libraries"
-        if libraries_dir.exists():
-            components["dylibs"].extend(libraries_dir.glob("*.dylib"))
-
-    # Also find dylibs in other frameworks
-    for dylib_path in framework_path.rglob("*.dylib"):
-        if dylib_path not in components["dylibs"]:
-            components["dylibs"].append(dylib_path)
-
-    # Find all nested apps (like Updater.app in Sparkle)
-    for nested_app in framework_path.rglob("*.app"):
-        if nested_app not in components["helpers"]:
-            components["apps"].append(nested_app)
+    return nxtscape_framework_paths
+
+
+def find_components_to_sign(
+    app_path: Path, ctx: Optional[BuildContext] = None
+) -> Dict[str, List[Path]]:
+    """Dynamically find all components that need signing.
+
+    Walks Contents/Frameworks once. Items reachable through symlinks
+    (Versions/Current, top-level framework links) are reported once, under
+    their real path, so nothing is signed twice.
+    """
+    components = {
+        "helpers": [],
+        "xpc_services": [],
+        "frameworks": [],
+        "dylibs": [],
+        "executables": [],
+        "apps": [],
+    }
+
+    framework_path = app_path / "Contents" / "Frameworks"
+    if not framework_path.exists():
+        return components
+
+    # Helpers come from the first EyeBrowserOS Framework location that has them
+    helpers_dir = None
+    for nxtscape_fw_path in get_nxtscape_framework_paths(framework_path, ctx):
+        if (nxtscape_fw_path / "Helpers").exists():
+            helpers_dir = os.path.realpath(nxtscape_fw_path / "Helpers")
+            break
+
+    seen = set()
+
+    def add(category: str, path: Path) -> None:
+        real_path = os.path.realpath(path)
+        if real_path not in seen:
+            seen.add(real_path)
+            components[category].append(path)
+
+    for dirpath, dirnames, filenames in os.walk(framework_path):
+        dirnames.sort()
+        in_helpers_dir = helpers_dir is not None and os.path.realpath(dirpath) == helpers_dir
+
+        for dirname in dirnames:
+            category = BUNDLE_SUFFIXES.get(os.path.splitext(dirname)[1])
+            if category:
+                if category == "apps" and in_helpers_dir:
+                    category = "helpers"
+                add(category, Path(dirpath, dirname))
+
+        for filename in sorted(filenames):
+            file_path = Path(dirpath, filename)
+            if filename.endswith(".dylib"):
+                add("dylibs", file_path)
+            elif in_helpers_dir and not file_path.suffix and os.access(file_path, os.X_OK):
+                # Executable helpers (files without extension)
+                add("executables", file_path)
+            elif (
+                filename == "Autoupdate"
+                and file_path.parent.name == "B"
+                and file_path.parent.parent.parent.name == "Sparkle.framework"
+            ):
+                # Sparkle's versioned executable at Versions/B/Autoupdate
+                add("executables", file_path)
 
     return components
 
 
+def build_signing_graph(
+    app_path: Path, components: Dict[str, List[Path]]
+) -> List[SigningComponent]:
+    """Link components to the components nested inside them and assign levels.
+
+    A component's level is one more than the highest level nested inside it,
+    so signing level by level always seals inner code before its container.
+    The main executable is included; the app bundle itself is signed last
+    and is not part of the graph. Returns components sorted by level.
+    """
+    nodes: Dict[str, SigningComponent] = {}
+    for category, paths in components.items():
+        for path in paths:
+            nodes[os.path.realpath(path)] = SigningComponent(path, category)
+
+    main_exe = app_path / "Contents" / "MacOS" / "EyeBrowserOS"
+    nodes.setdefault(os.path.realpath(main_exe), SigningComponent(main_exe, "main_executable"))
+
+    # Attach each component to its nearest enclosing component
+    roots = []
+    for real_path, node in nodes.items():
+        parent = os.path.dirname(real_path)
+        while parent not in nodes and os.path.dirname(parent) != parent:
+            parent = os.path.dirname(parent)
+        if parent in nodes:
+            nodes[parent].children.append(node)
+        else:
+            roots.append(node)
+
+    def assign_level(node: SigningComponent) -> int:
+        node.level = max((assign_level(child) + 1 for child in node.children), default=0)
+        return node.level
+
+    for root in roots:
+        assign_level(root)
+
+    # Within a level keep the old category order (Sparkle first among frameworks)
+    category_order = list(components) + ["main_executable"]
+    return sorted(
+        nodes.values(),
+        key=lambda node: (
+            node.level,
+            category_order.index(node.category),
+            0 if "Sparkle" in node.path.name else 1,
+            str(node.path),
+        ),
+    )
+
+
+def get_helper_entitlements(helper: Path, entitlements_dirs: List[Path]) -> Optional[Path]:
+    """Find the entitlements plist for a helper app, if any"""
+    entitlements_name = None
+
+    if "Renderer" in helper.name:
+        entitlements_name = "helper-renderer-entitlements.plist"
+    elif "GPU" in helper.name:
+        entitlements_name = "helper-gpu-entitlements.plist"
+    elif "Plugin" in helper.name:
+        entitlements_name = "helper-plugin-entitlements.plist"
+
+    if entitlements_name:
+        for ent_dir in entitlements_dirs:
+            ent_path = ent_dir / entitlements_name
+            if ent_path.exists():
+                return ent_path
+    return None
+
+
 def get_identifier_for_component(
     component_path: Path, base_identifier: str = "com.browseros"
 ) -> str:
@@ -255,6 +353,7 @@ def sign_component(
     identifier: Optional[str] = None,
     options: Optional[str] = None,
     entitlements: Optional[Path] = None,
+    runner: Optional[SigningRunner] = None,
 ) -> bool:
     """Sign a single component"""
     cmd = ["codesign", "--sign", certificate_name, "--force", "--timestamp"]
@@ -271,20 +370,79 @@ def sign_component(
     cmd.append(str(component_path))
 
     try:
-        run_command(cmd)
+        (runner or run_command)(cmd)
         return True
     except Exception as e:
         log_error(f"Failed to sign {component_path}: {e}")
         return False
 
 
+def sign_graph(
+    nodes: List[SigningComponent],
+    certificate_name: str,
+    entitlements_dirs: List[Path],
+    runner: Optional[SigningRunner] = None,
+    max_workers: Optional[int] = None,
+) -> bool:
+    """Sign components level by level, each level concurrently.
+
+    A level starts only after every component of the previous level was
+    signed; on failure the running level finishes and no further level
+    starts.
+    """
+
+    def sign_node(node: SigningComponent) -> bool:
+        path = node.path
+        if node.category == "main_executable":
+            return sign_component(
+                path, certificate_name, "com.browseros.EyeBrowserOS", runner=runner
+            )
+        identifier = get_identifier_for_component(path)
+        if node.category in ("dylibs", "frameworks"):
+            return sign_component(path, certificate_name, identifier, runner=runner)
+        entitlements = None
+        if node.category == "helpers":
+            entitlements = get_helper_entitlements(path, entitlements_dirs)
+        return sign_component(
+            path,
+            certificate_name,
+            identifier,
+            get_signing_options(path),
+            entitlements,
+            runner=runner,
+        )
+
+    levels: Dict[int, List[SigningComponent]] = {}
+    for node in nodes:
+        levels.setdefault(node.level, []).append(node)
+
+    with ContextThreadPoolExecutor(max_workers=max_workers or SIGN_WORKERS) as executor:
+        for level in sorted(levels):
+            batch = levels[level]
+            log_info(f"\n🔏 Signing level {level} ({len(batch)} components)...")
+            results = list(executor.map(sign_node, batch))
+            if not all(results):
+                return False
+
+    return True
+
+
 def sign_all_components(
     app_path: Path,
     certificate_name: str,
     root_dir: Path,
     ctx: Optional[BuildContext] = None,
+    runner: Optional[SigningRunner] = None,
+    max_workers: Optional[int] = None,
 ) -> bool:
-    """Sign all components in the correct order (bottom-up)"""
+    """Sign all components in the correct order (bottom-up).
+
+    Components are signed innermost first; all components at the same
+    nesting level are signed concurrently. runner replaces run_command for
+    every codesign call (e.g. a fake codesign).
+    """
+    runner = runner or run_command
+
     log_info("🔍 Discovering components to sign...")
     components = find_components_to_sign(app_path, ctx)
 
@@ -295,95 +453,17 @@ def sign_all_components(
         if items:
             log_info(f"  • {category}: {len(items)} items")
 
-    # Sign in correct order (bottom-up)
-    # 1. Sign XPC Services first
-    log_info("\n🔏 Signing XPC Services...")
-    for xpc in components["xpc_services"]:
-        identifier = get_identifier_for_component(xpc)
-        options = get_signing_options(xpc)
-        if not sign_component(xpc, certificate_name, identifier, options):
-            return False
-
-    # 2. Sign nested apps (like Sparkle's Updater.app)
-    if components["apps"]:
-        log_info("\n🔏 Signing nested applications...")
-        for nested_app in components["apps"]:
-            identifier = get_identifier_for_component(nested_app)
-            options = get_signing_options(nested_app)
-            if not sign_component(nested_app, certificate_name, identifier, options):
-                return False
-
-    # 3. Sign executables
-    if components["executables"]:
-        log_info("\n🔏 Signing executables...")
-        for exe in components["executables"]:
-            identifier = get_identifier_for_component(exe)
-            options = get_signing_options(exe)
-            if not sign_component(exe, certificate_name, identifier, options):
-                return False
-
-    # 4. Sign dylibs
-    if components["dylibs"]:
-        log_info("\n🔏 Signing dynamic libraries...")
-        for dylib in components["dylibs"]:
-            identifier = get_identifier_for_component(dylib)
-            if not sign_component(dylib, certificate_name, identifier):
-                return False
-
-    # 5. Sign helper apps
-    if components["helpers"]:
-        log_info("\n🔏 Signing helper applications...")
-        # Get entitlements directory from context
-        entitlements_dirs = []
-        if ctx:
-            entitlements_dirs.append(ctx.get_entitlements_dir())
-
-        for helper in components["helpers"]:
-            identifier = get_identifier_for_component(helper)
-            options = get_signing_options(helper)
-
-            # Check for specific entitlements
-            entitlements = None
-            entitlements_name = None
-
-            if "Renderer" in helper.name:
-                entitlements_name = "helper-renderer-entitlements.plist"
-            elif "GPU" in helper.name:
-                entitlements_name = "helper-gpu-entitlements.plist"
-            elif "Plugin" in helper.name:
-                entitlements_name = "helper-plugin-entitlements.plist"
-
-            if entitlements_name:
-                for ent_dir in entitlements_dirs:
-                    ent_path = ent_dir / entitlements_name
-                    if ent_path.exists():
-                        entitlements = ent_path
-                        break
-
-            if not sign_component(
-                helper, certificate_name, identifier, options, entitlements
-            ):
-                return False
-
-    # 6. Sign frameworks (except the main EyeBrowserOS Framework)
-    if components["frameworks"]:
-        log_info("\n🔏 Signing frameworks...")
-        # Sort to sign Sparkle.framework before EyeBrowserOS Framework.framework
-        frameworks_sorted = sorted(
-            components["frameworks"], key=lambda x: 0 if "Sparkle" in x.name else 1
-        )
-        for framework in frameworks_sorted:
-            identifier = get_identifier_for_component(framework)
-            if not sign_component(framework, certificate_name, identifier):
-                return False
+    # Get entitlements directory from context
+    entitlements_dirs = []
+    if ctx:
+        entitlements_dirs.append(ctx.get_entitlements_dir())
 
-    # 7. Sign main executable
-    log_info("\n🔏 Signing main executable...")
-    main_exe = app_path / "Contents" / "MacOS" / "EyeBrowserOS"
-    if not sign_component(main_exe, certificate_name, "com.browseros.EyeBrowserOS"):
+    # Sign nested components and the main executable, innermost first
+    nodes = build_signing_graph(app_path, components)
+    if not sign_graph(nodes, certificate_name, entitlements_dirs, runner, max_workers):
         return False
 
-    # 8. Finally sign the app bundle
+    # Finally sign the app bundle
     log_info("\n🔏 Signing application bundle...")
     requirements = (
         '=designated => identifier "com.browseros.EyeBrowserOS" and '
@@ -440,7 +520,7 @@ def sign_all_components(
     cmd.append(str(app_path))
 
     try:
-        run_command(cmd)
+        runner(cmd)
     except Exception:
         return False
 
@@ -3,10 +3,17 @@
 String replacement module for EyeBrowserOS build system
 """
 
+import os
 import re
+import json
+import hashlib
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
 from context import BuildContext
-from utils import log_info, log_success, log_error, log_warning
+from modules.patches import load_patch_ledger
+from utils import log_info, log_success, log_error, log_warning, get_file_hash
 
 
 # Strings we want to replace but that we also replace automatically
@@ -33,49 +40,192 @@ target_files = [
     "chrome/app/settings_chromium_strings.grdp",
 ]
 
-
-def apply_string_replacements(ctx: BuildContext) -> bool:
-    """Apply string replacements to specified files"""
+# File types rebranded when the whole tree is in scope
+tree_file_patterns = ["*.grd", "*.grdp", "*.xtb"]
+
+# Below this many files a process pool costs more than it saves
+MIN_FILES_FOR_POOL = 8
+
+
+def replace_sequential(content: str, replacements: Sequence[Tuple[str, str]]) -> Tuple[str, List[int]]:
+    """Apply rules one full pass at a time, in order; returns content and per-rule counts"""
+    counts = []
+    for pattern, replacement in replacements:
+        matches = len(re.findall(pattern, content))
+        if matches > 0:
+            content = re.sub(pattern, replacement, content)
+        counts.append(matches)
+    return content, counts
+
+
+def _brand_file(path: str, replacements: Tuple[Tuple[str, str], ...], known_hash: Optional[str]) -> Dict:
+    """Rebrand one file in place (runs in worker processes)"""
+    result = {"counts": [], "changed": False, "sha256": None, "error": None}
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        result["sha256"] = hashlib.sha256(data).hexdigest()
+        if result["sha256"] == known_hash:
+            # Already branded by a previous run
+            return result
+
+        # Same decoding as reading in text mode (universal newlines)
+        content = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        new_content, result["counts"] = replace_sequential(content, replacements)
+
+        # Write back if changes were made
+        if new_content != content:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(new_content)
+            result["changed"] = True
+            result["sha256"] = get_file_hash(path)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def find_tree_files(chromium_src: Path) -> List[str]:
+    """Find all translation/resource files to rebrand, relative to chromium_src"""
+    result = subprocess.run(
+        ["git", "ls-files", "-z", "--", *tree_file_patterns],
+        capture_output=True,
+        cwd=chromium_src,
+    )
+    if result.returncode == 0:
+        return sorted(path for path in result.stdout.decode("utf-8").split("\0") if path)
+
+    # Not a git checkout - walk the tree, skipping build output
+    suffixes = tuple(pattern[1:] for pattern in tree_file_patterns)
+    files = []
+    for dirpath, dirnames, filenames in os.walk(chromium_src):
+        dirnames[:] = [d for d in dirnames if d not in (".git", "out")]
+        for filename in filenames:
+            if filename.endswith(suffixes):
+                files.append(Path(dirpath, filename).relative_to(chromium_src).as_posix())
+    return sorted(files)
+
+
+def load_string_replace_manifest(manifest_path: Path, rules_hash: str) -> Dict:
+    """Load per-file state from the last run, dropped if the rules changed"""
+    if not manifest_path.exists():
+        return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        log_warning(f"Ignoring unreadable string replacement manifest: {e}")
+        return {}
+    if manifest.get("rules") != rules_hash:
+        return {}
+    return manifest.get("files", {})
+
+
+def save_string_replace_manifest(manifest_path: Path, rules_hash: str, files: Dict) -> None:
+    """Persist per-file state and replacement counts"""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"rules": rules_hash, "files": files}, f, indent=2)
+    tmp_path.replace(manifest_path)
+
+
+def apply_string_replacements(ctx: BuildContext, whole_tree: bool = False, max_workers: Optional[int] = None) -> bool:
+    """Apply string replacements to target files.
+
+    With whole_tree=True every tracked *.grd, *.grdp and *.xtb file is
+    rebranded using a process pool. Files unchanged since the last run (by
+    size/mtime, then content hash) and files recorded in the patch ledger
+    are skipped.
+    """
     log_info("\n🔤 Applying string replacements...")
 
-    success = True
+    replacements = tuple(tuple(rule) for rule in branding_replacements)
+    rules_hash = hashlib.sha256(json.dumps(replacements).encode("utf-8")).hexdigest()
+    manifest_path = ctx.get_string_replace_manifest()
+    manifest = load_string_replace_manifest(manifest_path, rules_hash)
+
+    if whole_tree:
+        files = find_tree_files(ctx.chromium_src)
+        log_info(f"  Found {len(files)} files in tree")
+    else:
+        files = target_files
+
+    # Files the patch series modified belong to the patch ledger: they were
+    # rebranded before they were first patched, and rebranding what a patch
+    # added would make the ledger see them as changed outside the series
+    patched_files = set(load_patch_ledger(ctx.get_patch_state_dir())["files"])
+    skipped = [file_path for file_path in files if file_path in patched_files]
+    if skipped:
+        log_info(f"  Skipping {len(skipped)} files modified by applied patches")
+        files = [file_path for file_path in files if file_path not in patched_files]
 
-    for file_path in target_files:
+    success = True
+    unchanged = 0
+    pending = []
+    for file_path in files:
         full_path = ctx.chromium_src / file_path
 
         if not full_path.exists():
             log_warning(f"  ⚠️  File not found: {file_path}")
+            manifest.pop(file_path, None)
             continue
 
-        log_info(f"  • Processing: {file_path}")
-
-        try:
-            # Read the file content
-            with open(full_path, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            original_content = content
-            replacement_count = 0
-
-            # Apply each replacement
-            for pattern, replacement in branding_replacements:
-                matches = len(re.findall(pattern, content))
-                if matches > 0:
-                    content = re.sub(pattern, replacement, content)
-                    replacement_count += matches
-                    log_info(f"    ✓ Replaced {matches} occurrences of '{pattern}'")
-
-            # Write back if changes were made
-            if content != original_content:
-                with open(full_path, "w", encoding="utf-8") as f:
-                    f.write(content)
-                log_success(f"    Updated with {replacement_count} total replacements")
-            else:
-                log_info(f"    No replacements needed")
-
-        except Exception as e:
-            log_error(f"    Error processing {file_path}: {e}")
+        st = full_path.stat()
+        record = manifest.get(file_path)
+        if record and record["size"] == st.st_size and record["mtime_ns"] == st.st_mtime_ns:
+            unchanged += 1
+            continue
+        pending.append((file_path, record))
+
+    def brand_all():
+        args = [
+            (str(ctx.chromium_src / file_path), replacements, record["sha256"] if record else None)
+            for file_path, record in pending
+        ]
+        if len(args) < MIN_FILES_FOR_POOL or max_workers == 1:
+            return [_brand_file(*a) for a in args]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_brand_file, *zip(*args), chunksize=16))
+
+    updated = 0
+    total_counts = [0] * len(replacements)
+    for (file_path, record), result in zip(pending, brand_all()):
+        if result["error"]:
+            log_error(f"    Error processing {file_path}: {result['error']}")
+            manifest.pop(file_path, None)
             success = False
+            continue
+
+        counts = {
+            replacements[i][0]: count for i, count in enumerate(result["counts"]) if count
+        }
+        if not result["counts"] and record:
+            # Content matched the last run, keep what was replaced back then
+            counts = record["counts"]
+
+        st = (ctx.chromium_src / file_path).stat()
+        manifest[file_path] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": result["sha256"],
+            "counts": counts,
+        }
+
+        if result["changed"]:
+            updated += 1
+            log_info(f"  • Updated: {file_path} ({sum(result['counts'])} replacements)")
+            for i, count in enumerate(result["counts"]):
+                if count:
+                    total_counts[i] += count
+                    log_info(f"    ✓ Replaced {count} occurrences of '{replacements[i][0]}'")
+        else:
+            unchanged += 1
+
+    save_string_replace_manifest(manifest_path, rules_hash, manifest)
+
+    log_info(f"  {updated} files updated, {unchanged} already up to date")
+    if updated:
+        log_info(f"  Total replacements: {sum(total_counts)}")
 
     if success:
         log_success("String replacements completed")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Resumable build pipeline: runs build steps as stages and remembers which
+ones completed, and with which inputs, so retries can skip finished work
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Set, Union
+from utils import log_info, log_warning, get_file_hash
+
+
+# Steps in pipeline order (per architecture steps, then universal steps)
+PIPELINE_STEPS = [
+    "clean",
+    "git_setup",
+    "apply_patches",
+    "configure",
+    "compile",
+    "sign",
+    "package",
+    "upload",
+    "merge",
+    "sign_universal",
+    "package_universal",
+    "upload_universal",
+]
+
+
+def hash_path(path: Optional[Union[str, Path]]) -> str:
+    """Content hash of a file or a whole directory tree ("missing" if absent)"""
+    if path is None:
+        return "none"
+    path = Path(path)
+    if path.is_file():
+        return get_file_hash(path)
+    if not path.is_dir():
+        return "missing"
+
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            file_path = Path(dirpath, filename)
+            digest.update(file_path.relative_to(path).as_posix().encode("utf-8"))
+            digest.update(get_file_hash(file_path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def fingerprint(inputs: Dict[str, object]) -> str:
+    """Stable hash of a stage's declared inputs"""
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BuildPipeline:
+    """Runs stages, skipping ones whose inputs are unchanged when resuming.
+
+    A stage is skipped with resume=True when its last run completed with the
+    same input fingerprint, its declared outputs exist and none of the
+    stages it depends on ran in this invocation. from_step skips every step
+    before the given one. Stage state is saved after each stage, so a failed
+    build can be resumed where it stopped. Stages of different architectures
+    may run from concurrent threads.
+    """
+
+    def __init__(self, state_file: Path, resume: bool = False, from_step: Optional[str] = None):
+        if from_step and from_step not in PIPELINE_STEPS:
+            raise ValueError(f"Unknown pipeline step: {from_step}")
+        self.state_file = state_file
+        self.resume = resume
+        self.from_step = from_step
+        self.stages = self._load()
+        self.ran: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict:
+        if not self.state_file.exists():
+            return {}
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f).get("stages", {})
+        except (OSError, json.JSONDecodeError) as e:
+            log_warning(f"Ignoring unreadable pipeline state {self.state_file}: {e}")
+            return {}
+
+    def _save(self) -> None:
+        # Callers hold self._lock
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.state_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stages}, f, indent=2)
+        tmp_file.replace(self.state_file)
+
+    def run(
+        self,
+        step: str,
+        func: Callable[[], object],
+        inputs: Callable[[], Dict[str, object]] = dict,
+        arch: str = "",
+        deps: Iterable[str] = (),
+        outputs: Iterable[Path] = (),
+        always: bool = False,
+    ) -> bool:
+        """Run a stage unless it can be skipped; True if it ran.
+
+        inputs is called before the stage (to decide on skipping) and again
+        after it completes (steps like version injection update their own
+        inputs). A stage returning False is not recorded as completed.
+        Stages with always=True, like an explicitly requested clean, are
+        never skipped on resume.
+        """
+        key = f"{step}:{arch}" if arch else step
+
+        if self.from_step and PIPELINE_STEPS.index(step) < PIPELINE_STEPS.index(self.from_step):
+            log_info(f"\n⏭️  Skipping {key} (before --from-step {self.from_step})")
+            return False
+
+        with self._lock:
+            upstream_ran = any(dep in self.ran for dep in deps)
+            record = self.stages.get(key)
+        if self.resume and not upstream_ran and not always:
+            if (
+                record
+                and record["fingerprint"] == fingerprint(inputs())
+                and all(Path(output).exists() for output in outputs)
+            ):
+                log_info(f"\n⏭️  Skipping {key} (inputs unchanged since {record['completed_at']})")
+                return False
+
+        # Forget the old result first so an interrupted stage is never skipped
+        with self._lock:
+            self.stages.pop(key, None)
+            self._save()
+
+        result = func()
+        with self._lock:
+            self.ran.add(key)
+        if result is False:
+            log_warning(f"{key} did not complete, it will run again on resume")
+            return True
+
+        record = {
+            "fingerprint": fingerprint(inputs()),
+            "completed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            self.stages[key] = record
+            self._save()
+        return True
@@ -0,0 +1,10 @@
+"""
+Shared test setup: make the build system's modules importable as build.py does
+"""
+
+import sys
+from pathlib import Path
+
+BUILD_DIR = Path(__file__).resolve().parent.parent
+if str(BUILD_DIR) not in sys.path:
+    sys.path.insert(0, str(BUILD_DIR))
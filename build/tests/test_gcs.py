@@ -0,0 +1,152 @@
+"""
+GCS uploads against an in-memory storage backend
+"""
+
+import base64
+import hashlib
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from modules import gcs
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.md5_hash = None
+        self.size = None
+        self.crc32c = None
+
+    def upload_from_filename(self, filename):
+        with self.bucket.lock:
+            self.bucket.attempts.append(self.name)
+            if self.bucket.failures.get(self.name):
+                self.bucket.failures[self.name] -= 1
+                raise ConnectionError("connection reset")
+        with open(filename, "rb") as f:
+            data = f.read()
+        md5 = base64.b64encode(hashlib.md5(data).digest()).decode("ascii")
+        if self.md5_hash and self.md5_hash != md5:
+            raise ValueError("md5 mismatch")
+        self.md5_hash = md5
+        self.size = len(data)
+        with self.bucket.lock:
+            self.bucket.objects[self.name] = self
+
+
+class FakeBucket:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.attempts = []
+        self.failures = {}  # blob name -> uploads that fail before one succeeds
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name):
+        with self.lock:
+            return self.objects.get(name)
+
+
+class FakeStorage:
+    """Stands in for the google.cloud.storage module"""
+
+    def __init__(self):
+        self.buckets = {}
+        storage = self
+
+        class Client:
+            def bucket(self, name):
+                return storage.buckets.setdefault(name, FakeBucket())
+
+        self.Client = Client
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    backend = FakeStorage()
+    gcs.set_storage_backend(backend)
+    monkeypatch.setattr(gcs, "RETRY_BASE_DELAY", 0)
+    # Blob names below use the Linux prefix
+    monkeypatch.setattr(gcs, "IS_WINDOWS", False)
+    monkeypatch.setattr(gcs, "IS_MACOS", False)
+    yield backend
+    gcs.set_storage_backend(None)
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    paths = []
+    for name, size in [("a_x64_linux.tar.gz", 1000), ("a_amd64.deb", 3000), ("a.AppImage", 0)]:
+        path = tmp_path / name
+        path.write_bytes(bytes(range(256)) * (size // 256) + b"x" * (size % 256))
+        paths.append(path)
+    return paths
+
+
+def upload(tmp_path, paths):
+    ctx = SimpleNamespace(root_dir=tmp_path, nxtscape_version="42")
+    return gcs.upload_to_gcs(ctx, paths)
+
+
+def test_second_upload_skips_unchanged_files(storage, tmp_path, artifacts):
+    success, uris = upload(tmp_path, artifacts)
+    assert success
+    assert uris == [f"gs://nxtscape/resources/42/linux/{path.name}" for path in artifacts]
+    bucket = storage.buckets["nxtscape"]
+    assert len(bucket.attempts) == 3
+
+    # Unchanged files are not uploaded again, a changed one is
+    artifacts[1].write_bytes(b"changed")
+    success, uris = upload(tmp_path, artifacts)
+    assert success
+    assert len(uris) == 3
+    assert bucket.attempts[3:] == ["resources/42/linux/a_amd64.deb"]
+    assert bucket.objects["resources/42/linux/a_amd64.deb"].size == len(b"changed")
+
+
+def test_transient_failure_is_retried(storage, tmp_path, artifacts):
+    bucket = storage.Client().bucket("nxtscape")
+    blob_name = f"resources/42/linux/{artifacts[0].name}"
+    bucket.failures[blob_name] = 2
+
+    success, uris = upload(tmp_path, artifacts)
+
+    assert success
+    assert len(uris) == 3
+    assert bucket.attempts.count(blob_name) == 3
+    assert bucket.objects[blob_name].size == artifacts[0].stat().st_size
+
+
+def test_persistent_failure_is_reported(storage, tmp_path, artifacts):
+    bucket = storage.Client().bucket("nxtscape")
+    blob_name = f"resources/42/linux/{artifacts[0].name}"
+    bucket.failures[blob_name] = gcs.UPLOAD_RETRIES
+
+    success, uris = upload(tmp_path, artifacts)
+
+    # The other files still go up
+    assert not success
+    assert bucket.attempts.count(blob_name) == gcs.UPLOAD_RETRIES
+    assert blob_name not in bucket.objects
+    assert len(uris) == 2
+
+
+def test_failed_lookup_uploads_once(storage, tmp_path, artifacts, monkeypatch):
+    bucket = storage.Client().bucket("nxtscape")
+
+    def get_blob(name):
+        raise PermissionError("403 storage.objects.get denied")
+
+    monkeypatch.setattr(bucket, "get_blob", get_blob)
+
+    success, uris = upload(tmp_path, artifacts)
+
+    # Write-only credentials: every file is uploaded, none is retried
+    assert success
+    assert len(uris) == 3
+    assert sorted(bucket.attempts) == sorted(f"resources/42/linux/{path.name}" for path in artifacts)
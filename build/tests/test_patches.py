@@ -0,0 +1,155 @@
+"""
+Patch series checks and the applied-patch ledger, on a temporary git tree
+"""
+
+import os
+import shutil
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from modules.patches import apply_patches, check_patch_series, describe_patch
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+
+def git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """A git tree with a few files, committed"""
+    tree = tmp_path / "src"
+    tree.mkdir()
+    (tree / "a.txt").write_text("one\ntwo\nthree\n")
+    (tree / "b.txt").write_text("alpha\nbeta\n")
+    (tree / "c.txt").write_text("red\ngreen\n")
+    git(tree, "init", "-q")
+    git(tree, "add", ".")
+    git(tree, "commit", "-q", "-m", "base")
+    return tree
+
+
+def make_patch(tree, patches_dir, name, edits):
+    """Write a patch of edits {path: new content} on top of the current tree"""
+    for path, content in edits.items():
+        (tree / path).write_text(content)
+    diff = subprocess.run(
+        ["git", "diff"], cwd=tree, check=True, capture_output=True, text=True
+    ).stdout
+    patch_path = patches_dir / name
+    patch_path.write_text(diff)
+    git(tree, "commit", "-q", "-a", "-m", name)
+    return patch_path
+
+
+def test_check_sees_lines_added_by_earlier_patches(tree, tmp_path):
+    patches_dir = tmp_path / "patches"
+    patches_dir.mkdir()
+    p1 = make_patch(tree, patches_dir, "p1.patch", {"a.txt": "one\ntwo\nadded\nthree\n"})
+    # p2's context includes the line p1 adds
+    p2 = make_patch(tree, patches_dir, "p2.patch", {"a.txt": "one\ntwo\nadded\nmore\nthree\n"})
+    p3 = make_patch(tree, patches_dir, "p3.patch", {"b.txt": "alpha\nbeta\ngamma\n"})
+    git(tree, "reset", "-q", "--hard", "HEAD~3")
+
+    patches = [p1, p2, p3]
+    entries = [describe_patch(path, patches_dir) for path in patches]
+    report = check_patch_series(patches, entries, tree)
+
+    assert [result["status"] for result in report] == ["ok", "ok", "ok"]
+
+
+def test_check_reports_the_conflicting_patch(tree, tmp_path):
+    patches_dir = tmp_path / "patches"
+    patches_dir.mkdir()
+    p1 = make_patch(tree, patches_dir, "p1.patch", {"a.txt": "one\ntwo\nadded\nthree\n"})
+    p2 = make_patch(tree, patches_dir, "p2.patch", {"a.txt": "one\ntwo\nadded\nmore\nthree\n"})
+    git(tree, "reset", "-q", "--hard", "HEAD~2")
+    # The tree no longer matches p1, so p1 and everything on top of it conflict
+    (tree / "a.txt").write_text("one\nchanged\nthree\n")
+
+    entries = [describe_patch(path, patches_dir) for path in (p1, p2)]
+    report = check_patch_series([p1, p2], entries, tree)
+
+    assert [result["status"] for result in report] == ["conflict", "conflict"]
+    assert report[0]["files"] == ["a.txt"]
+
+
+# Long before any patch run, so a file that was rewritten stands out
+OLD_MTIME = 1_500_000_000
+
+
+@pytest.fixture
+def series(tree, tmp_path):
+    """Three patches on different files, a second version of the last one,
+    and a context to apply them with; the tree is back at its base"""
+    patches_dir = tmp_path / "patches"
+    nxtscape_dir = patches_dir / "nxtscape"
+    nxtscape_dir.mkdir(parents=True)
+    make_patch(tree, nxtscape_dir, "p1.patch", {"a.txt": "one\ntwo\nthree\nfour\n"})
+    make_patch(tree, nxtscape_dir, "p2.patch", {"b.txt": "alpha\nbeta\ngamma\n"})
+    make_patch(tree, nxtscape_dir, "p3.patch", {"c.txt": "red\ngreen\nblue\n"})
+    git(tree, "reset", "-q", "--hard", "HEAD~1")
+    make_patch(tree, tmp_path, "p3_v2.patch", {"c.txt": "red\ngreen\nyellow\n"})
+    git(tree, "reset", "-q", "--hard", "HEAD~3")
+    (patches_dir / "series").write_text("nxtscape/p1.patch\nnxtscape/p2.patch\nnxtscape/p3.patch\n")
+
+    ctx = SimpleNamespace(
+        apply_patches=True,
+        chromium_src=tree,
+        get_patches_dir=lambda: patches_dir,
+        get_nxtscape_patches_dir=lambda: nxtscape_dir,
+        get_patch_state_dir=lambda: tmp_path / "out" / "nxtscape_patches",
+    )
+    assert apply_patches(ctx)
+    for name in ("a.txt", "b.txt", "c.txt"):
+        os.utime(tree / name, (OLD_MTIME, OLD_MTIME))
+    return ctx
+
+
+def mtime(ctx, name):
+    return (ctx.chromium_src / name).stat().st_mtime
+
+
+def test_edited_last_patch_is_the_only_one_reapplied(series, tmp_path, capsys):
+    capsys.readouterr()
+    shutil.copyfile(tmp_path / "p3_v2.patch", tmp_path / "patches" / "nxtscape" / "p3.patch")
+
+    assert apply_patches(series)
+
+    out = capsys.readouterr().out
+    assert "Reverting nxtscape/p3.patch" in out
+    assert out.count("Reverting") == 1
+    assert "Applying p3.patch" in out
+    assert out.count("* Applying") == 1
+    assert (series.chromium_src / "c.txt").read_text() == "red\ngreen\nyellow\n"
+    assert mtime(series, "a.txt") == mtime(series, "b.txt") == OLD_MTIME
+
+
+def test_file_reset_to_base_is_patched_again(series):
+    # e.g. overwritten by chromium file replacements
+    git(series.chromium_src, "checkout", "--", "b.txt")
+
+    assert apply_patches(series)
+
+    assert (series.chromium_src / "a.txt").read_text() == "one\ntwo\nthree\nfour\n"
+    assert (series.chromium_src / "b.txt").read_text() == "alpha\nbeta\ngamma\n"
+    assert (series.chromium_src / "c.txt").read_text() == "red\ngreen\nblue\n"
+    # p3 was re-applied after p2, but c.txt ended up with the same content
+    assert mtime(series, "a.txt") == mtime(series, "c.txt") == OLD_MTIME
+
+
+def test_hand_edited_patched_file_aborts(series):
+    (series.chromium_src / "a.txt").write_text("one\ntwo\nthree\nfour\nlocal edit\n")
+
+    with pytest.raises(RuntimeError, match="changed since last patch run"):
+        apply_patches(series)
+
+    assert (series.chromium_src / "a.txt").read_text() == "one\ntwo\nthree\nfour\nlocal edit\n"
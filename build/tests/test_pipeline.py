@@ -0,0 +1,28 @@
+"""
+Skipping stages on resume
+"""
+
+from pipeline import BuildPipeline
+
+
+def test_resume_skips_only_completed_stages(tmp_path):
+    state = tmp_path / "state.json"
+    first = BuildPipeline(state)
+    assert first.run("clean", lambda: True, always=True)
+    assert first.run("git_setup", lambda: True, lambda: {"version": 1})
+    assert first.run("apply_patches", lambda: False, lambda: {"version": 1})
+
+    calls = []
+    resumed = BuildPipeline(state, resume=True)
+    # An explicitly requested clean always runs
+    assert resumed.run("clean", lambda: calls.append("clean"), always=True)
+    # git_setup depends on clean, which ran
+    assert resumed.run("git_setup", lambda: calls.append("git_setup"), lambda: {"version": 1}, deps=["clean"])
+    # A stage that returned False is not recorded
+    assert resumed.run("apply_patches", lambda: calls.append("apply_patches"), lambda: {"version": 1})
+    assert calls == ["clean", "git_setup", "apply_patches"]
+
+    again = BuildPipeline(state, resume=True)
+    assert not again.run("git_setup", lambda: calls.append("git_setup"), lambda: {"version": 1})
+    assert not again.run("apply_patches", lambda: calls.append("apply_patches"), lambda: {"version": 1})
+    assert len(calls) == 3
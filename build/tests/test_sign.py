@@ -0,0 +1,125 @@
+"""
+Signing order on a synthetic app bundle, with a fake codesign
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+from modules.sign import build_signing_graph, find_components_to_sign, sign_all_components
+
+
+def make_app(root: Path) -> Path:
+    """EyeBrowserOS.app with the framework layout, versions and symlinks of a real build"""
+    app = root / "EyeBrowserOS.app"
+    contents = app / "Contents"
+    (contents / "MacOS").mkdir(parents=True)
+    (contents / "MacOS" / "EyeBrowserOS").write_text("main")
+
+    frameworks = contents / "Frameworks"
+    framework = frameworks / "EyeBrowserOS Framework.framework"
+    version = framework / "Versions" / "1.2.3"
+    for helper in ["EyeBrowserOS Helper.app", "EyeBrowserOS Helper (Renderer).app"]:
+        (version / "Helpers" / helper / "Contents" / "MacOS").mkdir(parents=True)
+    crashpad = version / "Helpers" / "chrome_crashpad_handler"
+    crashpad.write_text("crashpad")
+    crashpad.chmod(0o755)
+    (version / "Libraries").mkdir()
+    (version / "Libraries" / "libEGL.dylib").write_text("egl")
+    (version / "Frameworks" / "Inner.framework" / "Versions" / "A").mkdir(parents=True)
+    (version / "Frameworks" / "Inner.framework" / "Versions" / "A" / "libinner.dylib").write_text("inner")
+    os.symlink("1.2.3", framework / "Versions" / "Current")
+    os.symlink("Versions/Current/Helpers", framework / "Helpers")
+    os.symlink("Versions/Current/Libraries", framework / "Libraries")
+    # A second route to an already listed framework
+    os.symlink(
+        "EyeBrowserOS Framework.framework/Versions/Current/Frameworks/Inner.framework",
+        frameworks / "Alias.framework",
+    )
+
+    sparkle = frameworks / "Sparkle.framework" / "Versions" / "B"
+    (sparkle / "XPCServices" / "Installer.xpc" / "Contents").mkdir(parents=True)
+    (sparkle / "Updater.app" / "Contents" / "MacOS").mkdir(parents=True)
+    (sparkle / "Autoupdate").write_text("autoupdate")
+    os.symlink("B", frameworks / "Sparkle.framework" / "Versions" / "Current")
+    return app
+
+
+class FakeCodesign:
+    """Records when each path started and finished signing"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clock = 0
+        self.calls = []  # (real path, start, end)
+
+    def tick(self) -> int:
+        with self.lock:
+            self.clock += 1
+            return self.clock
+
+    def __call__(self, cmd):
+        assert cmd[0] == "codesign"
+        path = os.path.realpath(cmd[-1])
+        start = self.tick()
+        time.sleep(0.005)
+        end = self.tick()
+        with self.lock:
+            self.calls.append((path, start, end))
+
+
+def test_components_signed_once_inner_first(tmp_path):
+    app = make_app(tmp_path)
+    codesign = FakeCodesign()
+
+    assert sign_all_components(app, "Test Cert", tmp_path, runner=codesign, max_workers=4)
+
+    signed = [path for path, _, _ in codesign.calls]
+    version = os.path.realpath(
+        app / "Contents/Frameworks/EyeBrowserOS Framework.framework/Versions/1.2.3"
+    )
+    sparkle = os.path.realpath(app / "Contents/Frameworks/Sparkle.framework")
+    expected = {
+        os.path.realpath(app),
+        os.path.realpath(app / "Contents/MacOS/EyeBrowserOS"),
+        os.path.realpath(app / "Contents/Frameworks/EyeBrowserOS Framework.framework"),
+        f"{version}/Helpers/EyeBrowserOS Helper.app",
+        f"{version}/Helpers/EyeBrowserOS Helper (Renderer).app",
+        f"{version}/Helpers/chrome_crashpad_handler",
+        f"{version}/Libraries/libEGL.dylib",
+        f"{version}/Frameworks/Inner.framework",
+        f"{version}/Frameworks/Inner.framework/Versions/A/libinner.dylib",
+        sparkle,
+        f"{sparkle}/Versions/B/XPCServices/Installer.xpc",
+        f"{sparkle}/Versions/B/Updater.app",
+        f"{sparkle}/Versions/B/Autoupdate",
+    }
+    # Each component exactly once, also when reachable through symlinks
+    assert sorted(signed) == sorted(expected)
+
+    # Everything nested inside a component is sealed before it starts
+    for outer, outer_start, _ in codesign.calls:
+        for inner, _, inner_end in codesign.calls:
+            if inner.startswith(outer + os.sep):
+                assert inner_end < outer_start, f"{inner} signed after {outer}"
+
+    # The app bundle comes last
+    assert signed[-1] == os.path.realpath(app)
+
+
+def test_signing_levels_follow_nesting(tmp_path):
+    app = make_app(tmp_path)
+    nodes = build_signing_graph(app, find_components_to_sign(app))
+    level = {os.path.realpath(node.path): node.level for node in nodes}
+
+    inner = os.path.realpath(
+        app / "Contents/Frameworks/Alias.framework/Versions/A/libinner.dylib"
+    )
+    inner_framework = os.path.dirname(os.path.dirname(os.path.dirname(inner)))
+    framework = os.path.realpath(app / "Contents/Frameworks/EyeBrowserOS Framework.framework")
+
+    assert level[inner] == 0
+    assert level[inner_framework] == 1
+    assert level[framework] == 2
+    assert [node.level for node in nodes] == sorted(node.level for node in nodes)
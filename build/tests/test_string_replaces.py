@@ -0,0 +1,82 @@
+"""
+String replacements: original per-rule semantics and skipping unchanged files
+"""
+
+import os
+import re
+from types import SimpleNamespace
+
+from modules.patches import save_patch_ledger
+from modules.string_replaces import apply_string_replacements, branding_replacements, replace_sequential
+
+
+SAMPLES = [
+    "Copyright 2024 The Chromium Authors. All rights reserved.",
+    # "." in the copyright rules matches any character
+    "Google LLC, All rights reserved!",
+    "Google Chrome and Google Play, built on Chromium",
+    "<message>Chrome by Google</message>\r\n",
+]
+
+
+def reference(content: str) -> str:
+    """The replacement loop from before files were processed in parallel"""
+    for pattern, replacement in branding_replacements:
+        if re.findall(pattern, content):
+            content = re.sub(pattern, replacement, content)
+    return content
+
+
+def make_ctx(tmp_path, count):
+    src = tmp_path / "src"
+    for i in range(count):
+        path = src / "chrome" / "app" / "resources" / f"strings_{i}.xtb"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(SAMPLES[i % len(SAMPLES)].encode("utf-8"))
+    manifest = tmp_path / "out" / "string_replaces.json"
+    return SimpleNamespace(
+        chromium_src=src,
+        get_string_replace_manifest=lambda: manifest,
+        get_patch_state_dir=lambda: tmp_path / "out" / "patches",
+    )
+
+
+def test_copyright_rules_keep_original_semantics():
+    content, counts = replace_sequential("Google LLC, All rights reserved.", branding_replacements)
+    assert content == "The EyeBrowserOS Authors. All rights reserved."
+    assert counts[1] == 1
+    for sample in SAMPLES:
+        assert replace_sequential(sample, branding_replacements)[0] == reference(sample)
+
+
+def test_tree_matches_reference_and_skips_unchanged(tmp_path):
+    # Enough files for the process pool
+    ctx = make_ctx(tmp_path, 12)
+    files = sorted(ctx.chromium_src.rglob("*.xtb"))
+    originals = {path: path.read_text(encoding="utf-8") for path in files}
+
+    assert apply_string_replacements(ctx, whole_tree=True)
+    for path in files:
+        assert path.read_text(encoding="utf-8") == reference(originals[path])
+
+    # A second run leaves everything alone, even a file that was touched
+    mtimes = {path: path.stat().st_mtime_ns for path in files}
+    os.utime(files[0], ns=(mtimes[files[0]] + 10**9, mtimes[files[0]] + 10**9))
+    mtimes[files[0]] += 10**9
+    assert apply_string_replacements(ctx, whole_tree=True)
+    assert {path: path.stat().st_mtime_ns for path in files} == mtimes
+
+
+def test_files_in_patch_ledger_are_left_alone(tmp_path):
+    ctx = make_ctx(tmp_path, 2)
+    patched = "chrome/app/resources/strings_1.xtb"
+    save_patch_ledger(
+        ctx.get_patch_state_dir(),
+        {"patches": [], "files": {patched: {"base": None, "final": None}}},
+    )
+
+    assert apply_string_replacements(ctx, whole_tree=True)
+
+    assert (ctx.chromium_src / patched).read_text(encoding="utf-8") == SAMPLES[1]
+    other = ctx.chromium_src / "chrome/app/resources/strings_0.xtb"
+    assert other.read_text(encoding="utf-8") == reference(SAMPLES[0])
@@ -0,0 +1,177 @@
+"""
+The parallel universalizer must produce what the sequential one did
+"""
+
+import os
+import plistlib
+import random
+import shutil
+import stat
+import struct
+import sys
+import textwrap
+
+import pytest
+
+import universalizer_patched
+import universalizer_reference
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32" or shutil.which("file") is None,
+    reason="needs symlinks and file(1) (used by the reference implementation)",
+)
+
+X86_64 = (0x01000007, 3)
+ARM64 = (0x0100000C, 0)
+FIXED_TIME = 1_500_000_000
+
+# Stands in for lipo: -archs reads the header, -create concatenates inputs
+FAKE_LIPO = textwrap.dedent(
+    """\
+    #!{python}
+    import struct
+    import sys
+
+    NAMES = {{(0x01000007, 3): "x86_64", (0x0100000C, 0): "arm64"}}
+    args = sys.argv[1:]
+    if args[0] == "-archs":
+        with open(args[1], "rb") as f:
+            header = f.read(4096)
+        (magic,) = struct.unpack(">I", header[:4])
+        if magic == 0xCAFEBABE:
+            (count,) = struct.unpack(">I", header[4:8])
+            archs = [struct.unpack(">ii", header[8 + 20 * i:16 + 20 * i]) for i in range(count)]
+        else:
+            archs = [struct.unpack("<ii", header[4:12])]
+        print(" ".join(NAMES[arch] for arch in archs))
+    elif args[0] == "-create":
+        output = args[args.index("-output") + 1]
+        inputs = [
+            arg for arg in args[1:]
+            if arg != output and not arg.startswith("-") and arg not in ("x86_64", "arm64", "0x4000")
+        ]
+        with open(output, "wb") as out:
+            out.write(b"FAKEFAT")
+            for path in inputs:
+                with open(path, "rb") as f:
+                    out.write(f.read())
+    """
+)
+
+
+def thin_macho(cpu, body: bytes) -> bytes:
+    return struct.pack("<IiiIIII", 0xFEEDFACF, *cpu, 2, 0, 0, 0) + struct.pack("<I", 0) + body
+
+
+def fat_macho(cpus, body: bytes) -> bytes:
+    header = struct.pack(">II", 0xCAFEBABE, len(cpus))
+    return header + b"".join(struct.pack(">iiIII", *cpu, 0, 0, 14) for cpu in cpus) + body
+
+
+def make_app(root, arch: str) -> str:
+    """One architecture's app: Mach-O files, a universal tool, symlinks and plists"""
+    cpu = X86_64 if arch == "x64" else ARM64
+    contents = os.path.join(root, arch, "App.app", "Contents")
+    framework = os.path.join(contents, "Frameworks", "F.framework")
+    os.makedirs(os.path.join(contents, "MacOS"))
+    os.makedirs(os.path.join(framework, "Versions", "A", "Resources"))
+    os.makedirs(os.path.join(contents, "Resources", f"only_{arch}"))
+
+    def write(path, data):
+        with open(os.path.join(contents, path), "wb") as f:
+            f.write(data)
+
+    write("MacOS/App", thin_macho(cpu, arch.encode() * 100))
+    os.chmod(os.path.join(contents, "MacOS", "App"), 0o755)
+    write("Frameworks/F.framework/Versions/A/F", thin_macho(cpu, b"lib" + arch.encode()))
+    os.symlink("A", os.path.join(framework, "Versions", "Current"))
+    os.symlink("Versions/Current/F", os.path.join(framework, "F"))
+    # Large identical file, compared by content
+    write("Frameworks/F.framework/Versions/A/Resources/big.pak", random.Random(7).randbytes(3_000_000))
+    write("Resources/universal_tool", fat_macho([X86_64, ARM64], arch.encode()))
+    write("Resources/same.txt", b"same")
+    write("Resources/CodeResources", f"code resources {arch}".encode())
+    write(f"Resources/only_{arch}/x.txt", arch.encode())
+    write("Info.plist", plistlib.dumps({"CFBundleName": "App", "DTXcode": arch, "KSChannelID": arch}))
+
+    for dirpath, dirnames, filenames in os.walk(os.path.join(root, arch), topdown=False):
+        for name in dirnames + filenames:
+            os.utime(os.path.join(dirpath, name), (FIXED_TIME, FIXED_TIME), follow_symlinks=False)
+        os.utime(dirpath, (FIXED_TIME, FIXED_TIME))
+    # Same content, different mtime
+    mtime = FIXED_TIME + (0 if arch == "x64" else 500)
+    os.utime(os.path.join(contents, "Resources", "same.txt"), (mtime, mtime))
+    return os.path.join(root, arch, "App.app")
+
+
+def snapshot(root):
+    """Type, mode, content/target and mtime of everything in a tree"""
+    entries = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in [""] + dirnames + filenames:
+            path = os.path.join(dirpath, name) if name else dirpath
+            st = os.lstat(path)
+            # Times set to "now" by the merge differ between the two runs
+            mtime = int(st.st_mtime) if st.st_mtime < FIXED_TIME + 1000 else "now"
+            if stat.S_ISLNK(st.st_mode):
+                value = ("link", os.readlink(path), mtime)
+            elif stat.S_ISDIR(st.st_mode):
+                value = ("dir", oct(st.st_mode), mtime)
+            else:
+                with open(path, "rb") as f:
+                    value = ("file", oct(st.st_mode), f.read(), mtime)
+            entries[os.path.relpath(path, root)] = value
+    return entries
+
+
+@pytest.fixture
+def apps(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    lipo = bin_dir / "lipo"
+    lipo.write_text(FAKE_LIPO.format(python=sys.executable))
+    lipo.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return [make_app(str(tmp_path), "x64"), make_app(str(tmp_path), "arm64")]
+
+
+def test_output_matches_reference(tmp_path, apps, monkeypatch):
+    reference_output = str(tmp_path / "reference")
+    with monkeypatch.context() as patch:
+        if not hasattr(os, "lchmod"):
+            # The reference calls os.lchmod unconditionally (macOS only)
+            patch.setattr(
+                os,
+                "lchmod",
+                lambda path, mode: None if os.path.islink(path) else os.chmod(path, mode),
+                raising=False,
+            )
+        universalizer_reference.universalize(list(apps), reference_output)
+
+    output = str(tmp_path / "new")
+    universalizer_patched.universalize(list(apps), output, jobs=4)
+
+    expected = snapshot(reference_output)
+    actual = snapshot(output)
+    assert sorted(actual) == sorted(expected)
+    for path in expected:
+        assert actual[path] == expected[path], path
+    # lipo really ran on the thin Mach-O files
+    assert actual["Contents/MacOS/App"][2].startswith(b"FAKEFAT")
+
+
+def test_unmergeable_files_leave_no_output(tmp_path, apps):
+    for app, text in zip(apps, [b"a", b"b"]):
+        with open(os.path.join(app, "Contents", "Resources", "bad.txt"), "wb") as f:
+            f.write(text)
+
+    output = str(tmp_path / "new")
+    with pytest.raises(universalizer_patched.CantMergeException):
+        universalizer_patched.universalize(list(apps), output)
+    assert not os.path.exists(output)
+
+
+def test_short_macho_header_is_not_macho():
+    header = struct.pack(">I", 0xFEEDFACF)[::-1] + b"abcd"
+    assert universalizer_patched._parse_architectures(header) == set()
+    assert universalizer_patched._parse_architectures(thin_macho(ARM64, b"")) == {ARM64}
@@ -0,0 +1,44 @@
+"""
+Per-architecture log streams
+"""
+
+import threading
+
+import pytest
+
+import utils
+
+
+@pytest.fixture
+def main_log(tmp_path, monkeypatch):
+    log_file = open(tmp_path / "build_test.log", "w", encoding="utf-8")
+    monkeypatch.setattr(utils, "_log_file", log_file)
+    yield tmp_path / "build_test.log"
+    log_file.close()
+
+
+def test_worker_threads_log_to_the_submitting_stream(main_log, capsys):
+    def build_arch(name):
+        with utils.log_stream(name):
+            utils.log_info(f"start {name}")
+            with utils.ContextThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(lambda i: utils.log_error(f"worker {name} {i}"), range(3)))
+
+    threads = [threading.Thread(target=build_arch, args=(name,)) for name in ("x64", "arm64")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    utils.log_info("after")
+
+    printed = capsys.readouterr().out.splitlines()
+    for name, other in (("x64", "arm64"), ("arm64", "x64")):
+        for i in range(3):
+            assert any(
+                line.startswith(f"[{name}] ") and line.endswith(f"worker {name} {i}")
+                for line in printed
+            )
+        stream = (main_log.parent / f"build_test_{name}.log").read_text(encoding="utf-8")
+        assert stream.count(f"worker {name} ") == 3
+        assert f"worker {other} " not in stream
+    assert "after" in printed
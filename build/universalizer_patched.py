@@ -7,14 +7,22 @@
 
 import argparse
 import errno
-import filecmp
+import hashlib
 import os
 import plistlib
 import shutil
 import stat
+import struct
 import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    # Windows; reflinks are only attempted on Linux
+    fcntl = None
 
 
 def _stat_or_none(path, root):
@@ -202,44 +210,223 @@ def _merge_info_plists(input_paths, output_path):
     _write_plist(output_plist, output_path)
 
 
+# Mach-O magic numbers, as read big-endian from the first four bytes of a file.
+_MH_MAGICS = {
+    0xFEEDFACE: ">",  # MH_MAGIC, big-endian 32-bit
+    0xCEFAEDFE: "<",  # MH_CIGAM, little-endian 32-bit
+    0xFEEDFACF: ">",  # MH_MAGIC_64
+    0xCFFAEDFE: "<",  # MH_CIGAM_64
+}
+_FAT_MAGIC = 0xCAFEBABE
+_FAT_MAGIC_64 = 0xCAFEBABF
+
+# Java class files share the fat magic. Like file(1), treat a fat header as
+# Mach-O only when it claims a plausible number of architectures.
+_MAX_FAT_ARCHS = 20
+
+# The capability bits of a cpusubtype do not identify an architecture.
+_CPU_SUBTYPE_MASK = 0xFF000000
+
+# Enough for a fat header with _MAX_FAT_ARCHS 64-bit fat_arch entries.
+_HEADER_SIZE = 8 + 32 * _MAX_FAT_ARCHS
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Linux FICLONE ioctl: share the source's data blocks (reflink).
+_FICLONE = 0x40049409
+
+
+def _read_header(path):
+    """Reads the first bytes of a file, enough to identify a Mach-O file."""
+    with open(path, "rb") as file:
+        return file.read(_HEADER_SIZE)
+
+
+def _parse_architectures(header):
+    """Parses the architectures out of a Mach-O header.
+
+    Args:
+        header: The leading bytes of a file, as returned by _read_header.
+
+    Returns:
+        A set of (cputype, cpusubtype) pairs, one per architecture, or an
+        empty set if header does not belong to a Mach-O file.
+    """
+    if len(header) < 8:
+        return set()
+
+    (magic,) = struct.unpack(">I", header[:4])
+    if magic in _MH_MAGICS:
+        if len(header) < 12:
+            # Too short for cputype/cpusubtype: not a real Mach-O file
+            return set()
+        cputype, cpusubtype = struct.unpack(_MH_MAGICS[magic] + "ii", header[4:12])
+        return {(cputype, cpusubtype & ~_CPU_SUBTYPE_MASK)}
+
+    if magic in (_FAT_MAGIC, _FAT_MAGIC_64):
+        (nfat_arch,) = struct.unpack(">I", header[4:8])
+        if not 0 < nfat_arch < _MAX_FAT_ARCHS:
+            return set()
+        entry_size = 32 if magic == _FAT_MAGIC_64 else 20
+        archs = set()
+        for index in range(nfat_arch):
+            offset = 8 + index * entry_size
+            if len(header) < offset + 8:
+                return set()
+            cputype, cpusubtype = struct.unpack(">ii", header[offset : offset + 8])
+            archs.add((cputype, cpusubtype & ~_CPU_SUBTYPE_MASK))
+        return archs
+
+    return set()
+
+
 def _is_macho_file(path):
-    """Check if a file is a Mach-O binary."""
-    try:
-        # Try to get architectures - if it works, it's a Mach-O file
-        result = subprocess.run(
-            ["file", "-b", path], capture_output=True, text=True, check=True
-        )
-        return "Mach-O" in result.stdout
-    except subprocess.CalledProcessError:
-        return False
+    """Check if a file is a Mach-O binary, by its magic number."""
+    return bool(_parse_architectures(_read_header(path)))
 
 
 def _get_architectures(path):
-    """Get architectures of a Mach-O file using lipo."""
-    if not _is_macho_file(path):
-        return set()
+    """Get architectures of a Mach-O file as (cputype, cpusubtype) pairs."""
+    return _parse_architectures(_read_header(path))
 
-    try:
-        result = subprocess.run(
-            ["lipo", "-archs", path], capture_output=True, text=True, check=True
-        )
-        return set(result.stdout.strip().split())
-    except subprocess.CalledProcessError:
-        # Shouldn't happen if _is_macho_file worked correctly
-        return set()
+
+def _hash_file(path):
+    """Returns the SHA-256 digest of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.digest()
 
 
-def _universalize(input_paths, output_path, root):
-    """Merges multiple trees into a "universal" tree.
+def _copy_file(src, dst):
+    """Copies a file's contents, like shutil.copyfile, as cheaply as possible.
+
+    On Linux the copy is a reflink where the filesystem supports it, then
+    copy_file_range. Elsewhere shutil.copyfile already uses the platform's
+    fast copy. macOS clonefile() is not used: it also copies attributes and
+    extended attributes, which copyfile does not.
+    """
+    if not (sys.platform.startswith("linux") and hasattr(os, "copy_file_range")):
+        shutil.copyfile(src, dst)
+        return
+
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+            return
+        except OSError:
+            pass
+
+        remaining = os.fstat(src_file.fileno()).st_size
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(
+                    src_file.fileno(), dst_file.fileno(), remaining
+                )
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            remaining = -1
+
+        if remaining != 0:
+            # Not supported across these filesystems; start over
+            src_file.seek(0)
+            dst_file.seek(0)
+            dst_file.truncate()
+            shutil.copyfileobj(src_file, dst_file)
+
+
+def _lchmod(path, mode):
+    """Sets permissions without following symbolic links.
+
+    Platforms without lchmod (Linux) cannot change a link's own permissions,
+    which are meaningless there; links are left alone.
+    """
+    if hasattr(os, "lchmod"):
+        os.lchmod(path, mode)
+    elif not os.path.islink(path):
+        os.chmod(path, mode)
+
+
+def _lipo_create(input_paths, output_path):
+    """Merges Mach-O files into one universal file with lipo."""
+    command = ["lipo", "-create", "-output", output_path]
+
+    # Force 16kB alignment for both x86_64 and arm64 slices. The
+    # inherent alignment requirement for x86_64 (absent Rosetta
+    # x86_64-on-arm64 concerns) is 4kB, and that is what lipo
+    # traditionally aligned x86_64 slices to. Since
+    # cctools-959.0.1 (Xcode 11.4), lipo attempts to guess the
+    # desired alignment of each slice, with the sometimes
+    # comical result being a slice over-aligned for its
+    # architecture. Over-alignment is normally benign, but
+    # https://crbug.com/1281111 documents a bug caused by "slice
+    # mobility" in the the main executable across updates, when
+    # the x86_64 slice moved from its traditional offset of 4kB
+    # to 16kB as a result of over-aligning. Until a code change
+    # lifts that restriction, the main executable's physical
+    # layout across the installed base is frozen. In order to
+    # ensure that this temporary requirement can be met,
+    # artificially inflate the x86_64 slice's alignment
+    # requirement to 16kB to keep its location stable. The arm64
+    # slice's alignment requirement is also frozen at 16kB,
+    # although this is the correct value for that architecture.
+    #
+    # TODO(mark): Implement "Change 3" from
+    # https://crbug.com/1281111#c33 by reducing the x86_64
+    # alignment requirement to 4kB and truncating this comment,
+    # or if appropriate, implement "Change 3A" instead, updating
+    # this comment with a revised rationale.
+    command.extend(["-segalign", "x86_64", "0x4000"])
+    command.extend(["-segalign", "arm64", "0x4000"])
+
+    command.extend(input_paths)
+    subprocess.check_call(command)
+
+
+class _Entry(object):
+    """One path of the merged tree, and the input paths it is made from.
+
+    Attributes:
+        input_paths: The input paths present at this subpath.
+        input_stats: os.stat/os.lstat results for input_paths.
+        output_path: The path to produce in the merged tree.
+        type: 'file', 'directory' or 'symbolic_link'.
+        permission: The permission bits shared by all inputs.
+        identical: For files, whether all inputs have the same contents.
+        action: For files, how the output is produced: 'copy', 'plist' or
+            'lipo'.
+        target: For symbolic links, the target shared by all inputs.
+    """
+
+    def __init__(self, input_paths, input_stats, output_path, type):
+        self.input_paths = input_paths
+        self.input_stats = input_stats
+        self.output_path = output_path
+        self.type = type
+        self.permission = None
+        self.identical = True
+        self.action = "copy"
+        self.target = None
+
 
-    This function provides the recursive internal implementation for
-    universalize.
+def _build_manifest(input_paths, output_path, root, manifest):
+    """Walks parallel input trees, listing every path of the merged tree.
 
     Args:
-        input_paths: The input directory trees to be merged.
-        output_path: The merged tree to produce.
+        input_paths: The input paths to consider at this level.
+        output_path: The corresponding path in the merged tree.
         root: True if operating at the root of the input and output trees.
+        manifest: A list to append _Entry objects to, parents before their
+            children.
+
+    Raises:
+        An exception for differences that can never be merged (varying types,
+        permissions or symbolic link targets), before any output is written.
     """
+    input_paths = list(input_paths)
     input_stats = [_stat_or_none(x, root) for x in input_paths]
     for index in range(len(input_paths) - 1, -1, -1):
         if input_stats[index] is None:
@@ -251,139 +438,204 @@ def _universalize(input_paths, output_path, root):
         input_types, "varying types %r for input paths %r" % (input_types, input_paths)
     )
 
-    if type == "file":
-        identical = True
-        for index in range(1, len(input_paths)):
-            if not filecmp.cmp(input_paths[0], input_paths[index]):
-                identical = False
-                if os.path.basename(output_path) == "Info.plist" or os.path.basename(
-                    output_path
-                ).endswith("-Info.plist"):
-                    _merge_info_plists(input_paths, output_path)
-                else:
-                    # Check if this is a Mach-O file that can be merged
-                    is_macho = _is_macho_file(input_paths[0])
-
-                    if not is_macho:
-                        # Not a Mach-O file, handle as a regular file
-                        # For code signing resources, they should be identical
-                        if not identical:
-                            # If files differ but aren't Mach-O, this is an error
-                            # unless it's a known special case
-                            if os.path.basename(output_path) == "CodeResources":
-                                # CodeResources files can differ, just copy the first one
-                                shutil.copyfile(input_paths[0], output_path)
-                            else:
-                                raise CantMergeException(
-                                    "non-Mach-O files differ: %r" % input_paths
-                                )
-                    else:
-                        # Check if files are already universal with same architectures
-                        all_archs = []
-                        for path in input_paths:
-                            archs = _get_architectures(path)
-                            if archs:
-                                all_archs.append(archs)
-
-                        # If all files have the same non-empty architectures, they're likely the same universal binary
-                        if (
-                            all_archs
-                            and all(archs == all_archs[0] for archs in all_archs)
-                            and len(all_archs[0]) > 1
-                        ):
-                            # All files are universal with same architectures, just copy the first one
-                            shutil.copyfile(input_paths[0], output_path)
-                        else:
-                            # Normal lipo merge
-                            command = ["lipo", "-create", "-output", output_path]
-
-                            # Force 16kB alignment for both x86_64 and arm64 slices. The
-                            # inherent alignment requirement for x86_64 (absent Rosetta
-                            # x86_64-on-arm64 concerns) is 4kB, and that is what lipo
-                            # traditionally aligned x86_64 slices to. Since
-                            # cctools-959.0.1 (Xcode 11.4), lipo attempts to guess the
-                            # desired alignment of each slice, with the sometimes
-                            # comical result being a slice over-aligned for its
-                            # architecture. Over-alignment is normally benign, but
-                            # https://crbug.com/1281111 documents a bug caused by "slice
-                            # mobility" in the the main executable across updates, when
-                            # the x86_64 slice moved from its traditional offset of 4kB
-                            # to 16kB as a result of over-aligning. Until a code change
-                            # lifts that restriction, the main executable's physical
-                            # layout across the installed base is frozen. In order to
-                            # ensure that this temporary requirement can be met,
-                            # artificially inflate the x86_64 slice's alignment
-                            # requirement to 16kB to keep its location stable. The arm64
-                            # slice's alignment requirement is also frozen at 16kB,
-                            # although this is the correct value for that architecture.
-                            #
-                            # TODO(mark): Implement "Change 3" from
-                            # https://crbug.com/1281111#c33 by reducing the x86_64
-                            # alignment requirement to 4kB and truncating this comment,
-                            # or if appropriate, implement "Change 3A" instead, updating
-                            # this comment with a revised rationale.
-                            command.extend(["-segalign", "x86_64", "0x4000"])
-                            command.extend(["-segalign", "arm64", "0x4000"])
-
-                            command.extend(input_paths)
-                            subprocess.check_call(command)
-
-        if identical:
-            shutil.copyfile(input_paths[0], output_path)
-    elif type == "directory":
-        os.mkdir(output_path)
+    entry = _Entry(input_paths, input_stats, output_path, type)
+    manifest.append(entry)
 
+    if type == "directory":
         entries = set()
         for input in input_paths:
             entries.update(os.listdir(input))
 
-        for entry in entries:
-            input_entry_paths = [os.path.join(x, entry) for x in input_paths]
-            output_entry_path = os.path.join(output_path, entry)
-            _universalize(input_entry_paths, output_entry_path, False)
+        for name in sorted(entries):
+            _build_manifest(
+                [os.path.join(x, name) for x in input_paths],
+                os.path.join(output_path, name),
+                False,
+                manifest,
+            )
     elif type == "symbolic_link":
         targets = [os.readlink(x) for x in input_paths]
-        target = _sole_list_element(
+        entry.target = _sole_list_element(
             targets,
             "varying symbolic link targets %r for input paths %r"
             % (targets, input_paths),
         )
-        os.symlink(target, output_path)
 
     input_permissions = [stat.S_IMODE(x.st_mode) for x in input_stats]
-    permission = _sole_list_element(
+    entry.permission = _sole_list_element(
         input_permissions,
         "varying permissions %r for input paths %r"
         % (["0o%o" % x for x in input_permissions], input_paths),
     )
 
-    os.lchmod(output_path, permission)
 
-    if type != "file" or identical:
-        input_mtimes = [x.st_mtime for x in input_stats]
+def _same_signature(a, b):
+    """Whether two stats are equal under filecmp.cmp's shallow comparison."""
+    return (
+        stat.S_IFMT(a.st_mode) == stat.S_IFMT(b.st_mode)
+        and a.st_size == b.st_size
+        and a.st_mtime == b.st_mtime
+    )
+
+
+def _plan_files(manifest, executor):
+    """Decides how each file of the merged tree is produced.
+
+    Files are compared like filecmp.cmp: equal stat signatures count as
+    identical, then contents are compared. Contents are compared by hash,
+    with all needed hashes computed concurrently, and only for files whose
+    sizes match.
+
+    Args:
+        manifest: The list of _Entry objects from _build_manifest.
+        executor: A concurrent.futures.Executor to hash files on.
+
+    Raises:
+        CantMergeException if differing files cannot be merged.
+    """
+    files = [x for x in manifest if x.type == "file" and len(x.input_paths) > 1]
+
+    to_hash = set()
+    for entry in files:
+        first = entry.input_stats[0]
+        for path, st in zip(entry.input_paths[1:], entry.input_stats[1:]):
+            if not _same_signature(first, st) and first.st_size == st.st_size:
+                to_hash.add(entry.input_paths[0])
+                to_hash.add(path)
+
+    to_hash = sorted(to_hash)
+    hashes = dict(zip(to_hash, executor.map(_hash_file, to_hash)))
+
+    for entry in files:
+        first_path, first = entry.input_paths[0], entry.input_stats[0]
+        for path, st in zip(entry.input_paths[1:], entry.input_stats[1:]):
+            if _same_signature(first, st):
+                continue
+            if first.st_size != st.st_size or hashes[first_path] != hashes[path]:
+                entry.identical = False
+                break
+
+        if entry.identical:
+            continue
+
+        basename = os.path.basename(entry.output_path)
+        if basename == "Info.plist" or basename.endswith("-Info.plist"):
+            entry.action = "plist"
+            continue
+
+        # Check if this is a Mach-O file that can be merged
+        if not _is_macho_file(first_path):
+            # Not a Mach-O file. For code signing resources, they should be
+            # identical; CodeResources files can differ, the first one is used
+            if basename != "CodeResources":
+                raise CantMergeException(
+                    "non-Mach-O files differ: %r" % entry.input_paths
+                )
+            continue
+
+        # Check if files are already universal with same architectures
+        all_archs = []
+        for path in entry.input_paths:
+            archs = _get_architectures(path)
+            if archs:
+                all_archs.append(archs)
+
+        # If all files have the same non-empty architectures, they're likely
+        # the same universal binary: the first one is used
+        if not (
+            all_archs
+            and all(archs == all_archs[0] for archs in all_archs)
+            and len(all_archs[0]) > 1
+        ):
+            entry.action = "lipo"
+
+
+def _produce_file(entry):
+    """Writes one file of the merged tree, as planned by _plan_files."""
+    if entry.action == "plist":
+        _merge_info_plists(entry.input_paths, entry.output_path)
+    elif entry.action == "lipo":
+        _lipo_create(entry.input_paths, entry.output_path)
+    else:
+        _copy_file(entry.input_paths[0], entry.output_path)
+
+
+def _apply_metadata(entry):
+    """Sets permissions and, where the inputs agree, the modification time."""
+    _lchmod(entry.output_path, entry.permission)
+
+    if entry.type != "file" or entry.identical:
+        input_mtimes = [x.st_mtime for x in entry.input_stats]
         if len(set(input_mtimes)) == 1:
             times = (time.time(), input_mtimes[0])
             try:
                 # follow_symlinks is only available since Python 3.3.
-                os.utime(output_path, times, follow_symlinks=False)
-            except TypeError:
+                os.utime(entry.output_path, times, follow_symlinks=False)
+            except (TypeError, NotImplementedError):
                 # If it's a symbolic link and this version of Python isn't able
                 # to set its timestamp, just leave it alone.
-                if type != "symbolic_link":
-                    os.utime(output_path, times)
-        elif type == "directory":
+                if entry.type != "symbolic_link":
+                    os.utime(entry.output_path, times)
+        elif entry.type == "directory":
             # Always touch directories, in case a directory is a bundle, as a
             # cue to LaunchServices to invalidate anything it may have cached
             # about the bundle as it was being built.
-            os.utime(output_path, None)
+            os.utime(entry.output_path, None)
 
 
-def universalize(input_paths, output_path):
+def _universalize(input_paths, output_path, root, jobs=None):
+    """Merges multiple trees into a "universal" tree.
+
+    This function provides the internal implementation for universalize.
+    Both trees are first walked into a manifest and every file's merge is
+    planned, so unmergeable inputs fail before anything is written. Files
+    are then copied, merged and lipo'd concurrently. Directory metadata is
+    applied last, deepest first, so that writing into a directory never
+    disturbs its final modification time.
+
+    Args:
+        input_paths: The input directory trees to be merged.
+        output_path: The merged tree to produce.
+        root: True if operating at the root of the input and output trees.
+        jobs: The number of concurrent workers, os.cpu_count() if None.
+    """
+    manifest = []
+    _build_manifest(input_paths, output_path, root, manifest)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        _plan_files(manifest, executor)
+
+        # Parents come before their children in the manifest
+        for entry in manifest:
+            if entry.type == "directory":
+                os.mkdir(entry.output_path)
+            elif entry.type == "symbolic_link":
+                os.symlink(entry.target, entry.output_path)
+
+        futures = [
+            executor.submit(_produce_file, entry)
+            for entry in manifest
+            if entry.type == "file"
+        ]
+        for future in futures:
+            future.result()
+
+    for entry in manifest:
+        if entry.type != "directory":
+            _apply_metadata(entry)
+
+    for entry in reversed(manifest):
+        if entry.type == "directory":
+            _apply_metadata(entry)
+
+
+def universalize(input_paths, output_path, jobs=None):
     """Merges multiple trees into a "universal" tree.
 
     Args:
         input_paths: The input directory trees to be merged.
         output_path: The merged tree to produce.
+        jobs: The number of concurrent workers, os.cpu_count() if None.
 
     input_paths are expected to be parallel directory trees. Each directory
     entry at a given subpath in the input_paths, if present, must be identical
@@ -393,7 +645,7 @@ def universalize(input_paths, output_path):
     """
     rmtree_on_error = not os.path.exists(output_path)
     try:
-        return _universalize(input_paths, output_path, True)
+        return _universalize(input_paths, output_path, True, jobs)
     except:
         if rmtree_on_error and os.path.exists(output_path):
             shutil.rmtree(output_path)
@@ -413,13 +665,20 @@ def main(args):
         "be provided.",
     )
     parser.add_argument("output", help="The merged directory tree to produce.")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of files to hash, copy and lipo concurrently (default: "
+        "number of CPUs).",
+    )
     parsed = parser.parse_args(args)
     if len(parsed.inputs) < 2:
         raise Exception("too few inputs")
 
-    universalize(parsed.inputs, parsed.output)
+    universalize(parsed.inputs, parsed.output, parsed.jobs)
 
 
 if __name__ == "__main__":
     sys.exit(main(sys.argv[1:]))
-
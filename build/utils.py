@@ -5,9 +5,14 @@ Shared utilities for the build system
 
 import os
 import sys
+import hashlib
 import subprocess
+import threading
+import contextvars
 import yaml
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional, List, Dict, Union
 from datetime import datetime
@@ -20,32 +25,74 @@ IS_LINUX = sys.platform.startswith("linux")
 
 # Global log file handle
 _log_file = None
+_log_lock = threading.Lock()
+
+# Current log stream as (prefix, extra log file), see log_stream(). A context
+# variable, so worker threads started through ContextThreadPoolExecutor log
+# to the stream of the thread that submitted the work.
+_log_stream: contextvars.ContextVar = contextvars.ContextVar("log_stream", default=("", None))
 
 
 def _ensure_log_file():
     """Ensure log file is created with timestamp"""
     global _log_file
-    if _log_file is None:
-        # Create logs directory if it doesn't exist
-        log_dir = Path(__file__).parent.parent / "logs"
-        log_dir.mkdir(exist_ok=True)
-        
-        # Create log file with timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        log_file_path = log_dir / f"build_{timestamp}.log"
-        # Open with UTF-8 encoding to handle any characters
-        _log_file = open(log_file_path, 'w', encoding='utf-8')
-        _log_file.write(f"Nxtscape Build Log - Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        _log_file.write("=" * 80 + "\n\n")
+    with _log_lock:
+        if _log_file is None:
+            # Create logs directory if it doesn't exist
+            log_dir = Path(__file__).parent.parent / "logs"
+            log_dir.mkdir(exist_ok=True)
+            
+            # Create log file with timestamp
+            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            log_file_path = log_dir / f"build_{timestamp}.log"
+            # Open with UTF-8 encoding to handle any characters
+            _log_file = open(log_file_path, 'w', encoding='utf-8')
+            _log_file.write(f"Nxtscape Build Log - Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            _log_file.write("=" * 80 + "\n\n")
     return _log_file
 
 
 def _log_to_file(message: str):
-    """Write message to log file with timestamp"""
+    """Write message to log file (and the current stream file) with timestamp"""
     log_file = _ensure_log_file()
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_file.write(f"[{timestamp}] {message}\n")
-    log_file.flush()
+    prefix, stream_file = _log_stream.get()
+    with _log_lock:
+        log_file.write(f"[{timestamp}] {prefix}{message}\n")
+        log_file.flush()
+        if stream_file is not None:
+            stream_file.write(f"[{timestamp}] {message}\n")
+            stream_file.flush()
+
+
+def _print(message: str):
+    """Print to console, prefixed with the current stream name if any"""
+    print(f"{_log_stream.get()[0]}{message}")
+
+
+@contextmanager
+def log_stream(name: str):
+    """Tag console/log output of the current thread with [name] and also
+    write it to a separate logs/build_<timestamp>_<name>.log file.
+
+    Work submitted to a ContextThreadPoolExecutor from inside the block is
+    logged to the same stream."""
+    main_log = Path(_ensure_log_file().name)
+    stream_path = main_log.with_name(f"{main_log.stem}_{name}.log")
+    with open(stream_path, "a", encoding="utf-8") as stream_file:
+        token = _log_stream.set((f"[{name}] ", stream_file))
+        try:
+            yield stream_path
+        finally:
+            _log_stream.reset(token)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor running each task in the submitting thread's context,
+    so worker threads keep its log stream"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
 
 
 def _sanitize_for_windows(message: str) -> str:
@@ -57,32 +104,32 @@ def _sanitize_for_windows(message: str) -> str:
 
 def log_info(message: str):
     """Print info message"""
-    print(_sanitize_for_windows(message))
+    _print(_sanitize_for_windows(message))
     _log_to_file(f"INFO: {message}")
 
 def log_warning(message: str):
     """Print warning message"""
     if sys.platform == "win32":
-        print(f"[WARN] {_sanitize_for_windows(message)}")
+        _print(f"[WARN] {_sanitize_for_windows(message)}")
     else:
-        print(f"⚠️ {message}")
+        _print(f"⚠️ {message}")
     _log_to_file(f"WARNING: {message}")
 
 def log_error(message: str):
     """Print error message"""
     if sys.platform == "win32":
-        print(f"[ERROR] {_sanitize_for_windows(message)}")
+        _print(f"[ERROR] {_sanitize_for_windows(message)}")
     else:
-        print(f"❌ {message}")
+        _print(f"❌ {message}")
     _log_to_file(f"ERROR: {message}")
 
 
 def log_success(message: str):
     """Print success message"""
     if sys.platform == "win32":
-        print(f"[SUCCESS] {_sanitize_for_windows(message)}")
+        _print(f"[SUCCESS] {_sanitize_for_windows(message)}")
     else:
-        print(f"✅ {message}")
+        _print(f"✅ {message}")
     _log_to_file(f"SUCCESS: {message}")
 
 
@@ -116,7 +163,7 @@ def run_command(
         for line in iter(process.stdout.readline, ''):
             line = line.rstrip()
             if line:
-                print(line)  # Print to console in real-time
+                _print(line)  # Print to console in real-time
                 _log_to_file(f"RUN_COMMAND: STDOUT: {line}")  # Log to file
                 stdout_lines.append(line)
         
@@ -267,3 +314,11 @@ def safe_rmtree(path: Union[str, Path]) -> None:
         # On Unix-like systems, regular rmtree works fine
         shutil.rmtree(path)
 
+
+def get_file_hash(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """Get SHA-256 hex digest of a file, streamed in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()